@@ -1,350 +1,24 @@
 # -*- coding: utf-8 -*-
 
 import os
-import hashlib
-import secrets
-import datetime
 import logging
-import json
 import sys
-import spacy
 import random
-import pdfplumber
-import pytesseract
-import cv2
-import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QLabel, QVBoxLayout, QPushButton, QFileDialog,
     QWidget, QMessageBox, QDialog, QTreeWidget, QTreeWidgetItem, QCheckBox, QLineEdit, QGroupBox
 )
-from PyQt6.QtCore import Qt, QDir
+from PyQt6.QtCore import Qt, QDir, QObject, pyqtSignal
 from PyQt6.QtGui import QIcon, QFont
-from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
-from cryptography.hazmat.backends import default_backend
-from cryptography.hazmat.primitives import hashes, hmac
-from cryptography.hazmat.primitives.asymmetric import rsa, padding
-from cryptography.hazmat.primitives import serialization
-from spacy.training.example import Example
 from PyQt6.QtWidgets import QApplication
 from gui import FileEncryptionApp
+from anonymize import anonymize_image, load_image
+from core import decrypt_file, encrypt_many, get_auth_service, validate_password_strength
 
 # Konfiguracja logowania
 logging.basicConfig(filename='operations.log', level=logging.INFO, format='%(asctime)s - %(message)s')
 
-# Ustawienie ścieżki do Tesseract OCR (jeśli wymagane na Windows)
-pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
-
-# Funkcja do wczytywania tekstu z obrazu (OCR)
-def load_image(file_path):
-    try:
-        image = cv2.imread(file_path)
-        if image is None:
-            raise ValueError("Nie można wczytać obrazu.")
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)  # Konwersja na szarości dla lepszej jakości OCR
-        text = pytesseract.image_to_string(gray, lang='pol')  # OCR na obrazie
-        return text.strip(), image
-    except Exception as e:
-        print(f"Błąd podczas wczytywania obrazu: {e}")
-        return None, None
-
-# Funkcja do anonimizacji danych w obrazie
-def anonymize_image(image_path):
-    try:
-        text, image = load_image(image_path)
-        if text is None or image is None:
-            raise ValueError("Nie można przetworzyć obrazu.")
-        
-        nlp = spacy.load("ner_model")
-        doc = nlp(text)
-        
-        # Wykrywanie pozycji wykrytych encji
-        for ent in doc.ents:
-            boxes = pytesseract.image_to_boxes(image, lang='pol').splitlines()
-            for box in boxes:
-                box_data = box.split()
-                if len(box_data) == 6:
-                    char, x, y, w, h = box_data[0], int(box_data[1]), int(box_data[2]), int(box_data[3]), int(box_data[4])
-                    if ent.text.find(char) != -1:
-                        cv2.rectangle(image, (x, image.shape[0] - y), (w, image.shape[0] - h), (0, 0, 0), -1)
-        
-        # Zapisanie obrazu z anonimizacją
-        anonymized_path = image_path.replace(".png", "_anonimized.png").replace(".jpg", "_anonimized.jpg").replace(".tiff", "_anonimized.tiff")
-        cv2.imwrite(anonymized_path, image)
-        return anonymized_path
-    except Exception as e:
-        print(f"Błąd podczas anonimizacji obrazu: {e}")
-        return None
-
-# Funkcja generowania identyfikatora pliku (hash)
-def generate_file_id(file_path):
-    hash_func = hashlib.sha256()
-    with open(file_path, "rb") as f:
-        while chunk := f.read(4096):
-            hash_func.update(chunk)
-    file_id = hash_func.digest()
-    logging.info(f"Wygenerowano identyfikator pliku: {file_id.hex()}")
-    return file_id
-
-# Funkcja usuwania pliku
-def delete_file(file_path):
-    try:
-        if os.path.isfile(file_path):
-            os.remove(file_path)
-            logging.info(f"Usunięto plik: {file_path}")
-        else:
-            logging.warning(f"Plik do usunięcia nie istnieje: {file_path}")
-    except Exception as e:
-        logging.error(f"Błąd podczas usuwania pliku {file_path}: {e}")
-
-# Funkcja szyfrowania pliku
-def encrypt_file(file_path, compress=False, password=None, use_rsa=False, delete_original=False):
-    try:
-        logging.info(f"Rozpoczęto szyfrowanie pliku: {file_path}")
-        
-        # Generowanie klucza AES (256-bitowy)
-        key = secrets.token_bytes(32)  # 256-bitowy klucz AES
-        iv = secrets.token_bytes(16)   # 128-bitowy IV
-        logging.info(f"Wygenerowano klucz AES: {key.hex()}")
-        logging.info(f"Wygenerowano IV: {iv.hex()}")
-
-        # Otwarcie pliku do odczytu
-        with open(file_path, "rb") as f:
-            plaintext = f.read()
-        logging.info(f"Odczytano plik do zaszyfrowania: {len(plaintext)} bajtów")
-
-        # Szyfrowanie danych
-        cipher = Cipher(algorithms.AES(key), modes.CFB(iv), backend=default_backend())
-        encryptor = cipher.encryptor()
-        ciphertext = encryptor.update(plaintext) + encryptor.finalize()
-        logging.info(f"Zaszyfrowano dane: {len(ciphertext)} bajtów")
-
-        # Zapis zaszyfrowanego pliku
-        encrypted_path = file_path + ".enc"
-        with open(encrypted_path, "wb") as f:
-            f.write(iv + ciphertext)
-        logging.info(f"Zapisano zaszyfrowany plik: {encrypted_path}")
-
-        # Generowanie HMAC dla weryfikacji integralności
-        hmac_key = secrets.token_bytes(32)  # Klucz HMAC
-        hmac_generator = hmac.HMAC(hmac_key, hashes.SHA256(), backend=default_backend())
-        hmac_generator.update(ciphertext)
-        hmac_digest = hmac_generator.finalize()
-        logging.info(f"Wygenerowano HMAC: {hmac_digest.hex()}")
-
-        # Zapis HMAC do pliku
-        with open(encrypted_path + ".hmac", "wb") as f:
-            f.write(hmac_digest)
-        logging.info(f"Zapisano HMAC do pliku: {encrypted_path}.hmac")
-
-        # Generowanie identyfikatora pliku
-        file_id = generate_file_id(file_path)
-        logging.info(f"Wygenerowano identyfikator pliku: {file_id.hex()}")
-
-        # Zapis klucza, identyfikatora pliku i klucza HMAC
-        key_path = file_path + ".key"
-        with open(key_path, "wb") as f:
-            f.write(file_id + key + hmac_key)  # Dodaj hmac_key do pliku .key
-        logging.info(f"Zapisano klucz AES i HMAC do pliku: {key_path}")
-
-        # Usuń oryginalny plik, jeśli użytkownik zaznaczył opcję
-        if delete_original:
-            delete_file(file_path)
-
-        return encrypted_path, key_path
-    except Exception as e:
-        logging.error(f"Błąd podczas szyfrowania pliku {file_path}: {e}")
-        return None, None
-
-# Funkcja odszyfrowywania pliku
-def decrypt_file(file_path, key_path, password=None, use_rsa=False, delete_keys=False, delete_encrypted=False):
-    try:
-        logging.info(f"Rozpoczęto odszyfrowywanie pliku: {file_path}")
-        
-        # Sprawdź, czy plik i klucz istnieją
-        if not os.path.isfile(file_path):
-            logging.error(f"Plik do odszyfrowania nie istnieje: {file_path}")
-            return "Plik do odszyfrowania nie istnieje."
-
-        if not os.path.isfile(key_path):
-            logging.error(f"Plik klucza nie istnieje: {key_path}")
-            return "Plik klucza nie istnieje."
-
-        # Odczyt klucza, identyfikatora i klucza HMAC z pliku .key
-        with open(key_path, "rb") as f:
-            file_id = f.read(32)  # Pierwsze 32 bajty to identyfikator pliku
-            key = f.read(32)      # Kolejne 32 bajty to klucz AES
-            hmac_key = f.read(32) # Kolejne 32 bajty to klucz HMAC
-        logging.info(f"Odczytano identyfikator pliku: {file_id.hex()}")
-        logging.info(f"Odczytano klucz AES: {key.hex()}")
-        logging.info(f"Odczytano klucz HMAC: {hmac_key.hex()}")
-
-        # Sprawdź, czy oryginalny plik istnieje
-        original_file_path = file_path.replace(".enc", "")
-        if os.path.isfile(original_file_path):
-            # Generowanie identyfikatora z oryginalnego pliku
-            actual_file_id = generate_file_id(original_file_path)
-            logging.info(f"Wygenerowano aktualny identyfikator pliku: {actual_file_id.hex()}")
-
-            # Weryfikacja identyfikatora
-            if file_id != actual_file_id:
-                logging.error("Klucz nie pasuje do tego pliku!")
-                return "Klucz nie pasuje do tego pliku!"
-        else:
-            logging.warning("Oryginalny plik nie istnieje. Pominięto weryfikację identyfikatora.")
-
-        # Sprawdź długość klucza AES
-        if len(key) != 32:
-            logging.error(f"Niewłaściwa długość klucza AES: {len(key)} bajtów")
-            return "Niewłaściwa długość klucza AES."
-
-        # Odczyt zaszyfrowanego pliku
-        with open(file_path, "rb") as f:
-            data = f.read()
-        logging.info(f"Odczytano zaszyfrowany plik: {len(data)} bajtów")
-
-        # Sprawdź, czy plik ma wystarczającą długość (co najmniej 16 bajtów IV)
-        if len(data) < 16:
-            logging.error(f"Plik zaszyfrowany jest zbyt krótki: {len(data)} bajtów")
-            return "Plik zaszyfrowany jest zbyt krótki."
-
-        # IV (pierwsze 16 bajtów)
-        iv = data[:16]
-        # Zaszyfrowane dane
-        encrypted_data = data[16:]
-        logging.info(f"Odczytano IV: {iv.hex()}")
-        logging.info(f"Odczytano zaszyfrowane dane: {len(encrypted_data)} bajtów")
-
-        # Weryfikacja integralności pliku
-        if not os.path.isfile(file_path + ".hmac"):
-            logging.error(f"Brak pliku HMAC dla pliku: {file_path}")
-            return "Brak pliku HMAC."
-
-        with open(file_path + ".hmac", "rb") as f:
-            hmac_digest = f.read()
-        logging.info(f"Odczytano HMAC: {hmac_digest.hex()}")
-
-        hmac_verifier = hmac.HMAC(hmac_key, hashes.SHA256(), backend=default_backend())
-        hmac_verifier.update(encrypted_data)
-        try:
-            hmac_verifier.verify(hmac_digest)
-            logging.info("Weryfikacja HMAC zakończona sukcesem.")
-        except Exception as e:
-            logging.error(f"Błąd weryfikacji HMAC: {e}")
-            return "Błąd weryfikacji HMAC."
-
-        # Odszyfrowywanie
-        cipher = Cipher(algorithms.AES(key), modes.CFB(iv), backend=default_backend())
-        decryptor = cipher.decryptor()
-        decrypted_data = decryptor.update(encrypted_data) + decryptor.finalize()
-        logging.info(f"Odszyfrowano dane: {len(decrypted_data)} bajtów")
-
-        # Zapis odszyfrowanego pliku
-        decrypted_path = file_path.replace(".enc", "")
-        with open(decrypted_path, "wb") as f:
-            f.write(decrypted_data)
-        logging.info(f"Zapisano odszyfrowany plik: {decrypted_path}")
-
-        # Usuń pliki klucza i HMAC, jeśli użytkownik zaznaczył opcję
-        if delete_keys:
-            delete_file(key_path)
-            delete_file(file_path + ".hmac")
-            logging.info(f"Usunięto pliki klucza i HMAC.")
-
-        # Usuń zaszyfrowany plik, jeśli użytkownik zaznaczył opcję
-        if delete_encrypted:
-            delete_file(file_path)
-            logging.info(f"Usunięto zaszyfrowany plik: {file_path}")
-
-        return decrypted_path
-    except Exception as e:
-        logging.error(f"Błąd podczas odszyfrowywania pliku {file_path}: {e}")
-        return str(e)
-
-# Parametry hashowania haseł
-PASSWORD_ITERATIONS = 120000
-PASSWORD_SALT_BYTES = 16
-
-
-# Funkcja walidująca złożoność hasła
-def validate_password_strength(password):
-    errors = []
-    if len(password) < 10:
-        errors.append("Hasło musi mieć co najmniej 10 znaków.")
-    if not any(char.isupper() for char in password):
-        errors.append("Hasło musi zawierać wielką literę.")
-    if not any(char.islower() for char in password):
-        errors.append("Hasło musi zawierać małą literę.")
-    if not any(char.isdigit() for char in password):
-        errors.append("Hasło musi zawierać cyfrę.")
-    if not any(char in "!@#$%^&*()_-+=[]{};:'\",.<>?/" for char in password):
-        errors.append("Hasło musi zawierać znak specjalny.")
-    return errors
-
-
-# Funkcja hashowania hasła (PBKDF2)
-def hash_password(password, salt=None, iterations=PASSWORD_ITERATIONS):
-    salt = salt or secrets.token_bytes(PASSWORD_SALT_BYTES)
-    derived = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations)
-    return derived.hex(), salt.hex(), iterations
-
-
-def verify_password(password, user_record):
-    """Sprawdza hasło zarówno dla nowych, jak i starszych kont."""
-    if "salt" in user_record:
-        stored_hash = user_record.get("password_hash", "")
-        salt = bytes.fromhex(user_record.get("salt", ""))
-        iterations = user_record.get("iterations", PASSWORD_ITERATIONS)
-        new_hash, _, _ = hash_password(password, salt=salt, iterations=iterations)
-        return secrets.compare_digest(stored_hash, new_hash)
-
-    # Obsługa starszego schematu SHA-256 bez soli
-    legacy_hash = hashlib.sha256(password.encode()).hexdigest()
-    return secrets.compare_digest(user_record.get("password_hash", ""), legacy_hash)
-
-# Funkcja rejestracji użytkownika
-def register_user(username, password, email=None):
-    if os.path.exists("users.json"):
-        with open("users.json", "r") as f:
-            data = json.load(f)
-    else:
-        data = {"users": []}
-
-    for user in data["users"]:
-        if user["username"].lower() == username.lower():
-            return False  # Użytkownik już istnieje
-        if email and user.get("email", "").lower() == email.lower():
-            return False  # Email już użyty
-
-    password_hash, salt, iterations = hash_password(password)
-
-    data["users"].append({
-        "username": username,
-        "email": email or "",
-        "password_hash": password_hash,
-        "salt": salt,
-        "iterations": iterations,
-        "created_at": datetime.datetime.utcnow().isoformat() + "Z",
-    })
-
-    with open("users.json", "w") as f:
-        json.dump(data, f, indent=4)
-
-    return True
-
-# Funkcja logowania użytkownika
-def login_user(username, password):
-    if not os.path.exists("users.json"):
-        return False  # Brak zarejestrowanych użytkowników
-
-    with open("users.json", "r") as f:
-        data = json.load(f)
-
-    for user in data["users"]:
-        if user["username"].lower() == username.lower() and verify_password(password, user):
-            return True  # Logowanie zakończone sukcesem
-
-    return False  # Nieprawidłowa nazwa użytkownika lub hasło
-
 # Klasa etykiety obsługującej przeciąganie i upuszczanie
 class DragDropLabel(QLabel):
     def __init__(self, parent=None, on_drop=None):
@@ -365,6 +39,18 @@ class DragDropLabel(QLabel):
         else:
             event.ignore()
 
+# Most między pracą w tle (uwierzytelnianie, szyfrowanie wsadowe) a interfejsem: wynik z wątku
+# roboczego trafia przez sygnał Qt do funkcji obsługi wywoływanej w wątku interfejsu graficznego
+class FutureBridge(QObject):
+    finished = pyqtSignal(object)
+
+    def __init__(self, handler, parent=None):
+        super().__init__(parent)
+        self.finished.connect(handler)
+
+    def watch(self, future):
+        future.add_done_callback(self.finished.emit)
+
 # Klasa okna logowania
 class LoginDialog(QDialog):
     def __init__(self, parent=None):
@@ -394,12 +80,25 @@ class LoginDialog(QDialog):
         layout.addWidget(self.login_button)
 
         self.setLayout(layout)
+        self.auth_bridge = FutureBridge(self.on_login_finished, self)
 
     def attempt_login(self):
         username = self.username_input.text()
         password = self.password_input.text()
 
-        if login_user(username, password):
+        # Hasło jest sprawdzane w puli usługi uwierzytelniania, więc okno pozostaje responsywne
+        self.login_button.setEnabled(False)
+        self.auth_bridge.watch(get_auth_service().login(username, password))
+
+    def on_login_finished(self, future):
+        self.login_button.setEnabled(True)
+        try:
+            logged_in = future.result()
+        except Exception as e:
+            logging.error(f"Błąd podczas logowania: {e}")
+            logged_in = False
+
+        if logged_in:
             self.accept()  # Zamyka okno logowania i zwraca QDialog.DialogCode.Accepted
         else:
             QMessageBox.warning(self, "Błąd", "Nieprawidłowa nazwa użytkownika lub hasło.")
@@ -457,6 +156,7 @@ class RegisterDialog(QDialog):
         layout.addWidget(self.back_to_login_button)
 
         self.setLayout(layout)
+        self.auth_bridge = FutureBridge(self.on_register_finished, self)
 
     def attempt_register(self):
         username = self.username_input.text()
@@ -477,7 +177,19 @@ class RegisterDialog(QDialog):
             QMessageBox.warning(self, "Błąd", "\n".join(errors))
             return
 
-        if register_user(username, password, email=email):
+        # Hashowanie hasła odbywa się w puli usługi uwierzytelniania
+        self.register_button.setEnabled(False)
+        self.auth_bridge.watch(get_auth_service().register(username, password, email=email))
+
+    def on_register_finished(self, future):
+        self.register_button.setEnabled(True)
+        try:
+            registered = future.result()
+        except Exception as e:
+            logging.error(f"Błąd podczas rejestracji: {e}")
+            registered = False
+
+        if registered:
             QMessageBox.information(self, "Sukces", "Rejestracja zakończona sukcesem.")
             self.accept()  # Zamyka okno rejestracji i zwraca QDialog.DialogCode.Accepted
         else:
@@ -568,6 +280,10 @@ class FileEncryptionApp(QMainWindow):
         tips_group.setLayout(tips_layout)
         layout.addWidget(tips_group)
 
+        # Szyfrowanie wsadowe działa w tle, aby okno pozostało responsywne
+        self.batch_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="batch")
+        self.batch_bridge = FutureBridge(self.on_batch_finished, self)
+
         # Odśwież listę plików przy starcie
         self.refresh_file_list()
 
@@ -593,53 +309,80 @@ class FileEncryptionApp(QMainWindow):
         )
 
         if reply == QMessageBox.StandardButton.Yes:
-            # Zaszyfruj plik
-            encrypted_path, key_path = encrypt_file(
-                file_path,
-                compress=True,
-                password="secure_password",
-                use_rsa=False,
-                delete_original=self.delete_original_checkbox.isChecked()
-            )
-            if encrypted_path and os.path.exists(encrypted_path):
-                QMessageBox.information(self, "Sukces", f"Plik zaszyfrowano: {encrypted_path}\nKlucz zapisano: {key_path}")
-            else:
-                QMessageBox.warning(self, "Błąd", f"Nie udało się zaszyfrować pliku: {file_path}")
+            # Zaszyfruj plik (w tle, jak szyfrowanie wsadowe)
+            self.encrypt_paths([file_path])
 
     # Obsługa przeciągania plików do szyfrowania
-    def handle_encrypt_drop(self, files):
-        for file_path in files:
-            if os.path.isfile(file_path):
-                encrypted_path, key_path = encrypt_file(
-                    file_path,
-                    compress=True,
-                    password="secure_password",
-                    use_rsa=False,
-                    delete_original=self.delete_original_checkbox.isChecked()
-                )
-                if encrypted_path and os.path.exists(encrypted_path):
-                    QMessageBox.information(self, "Sukces", f"Plik zaszyfrowano: {encrypted_path}\nKlucz zapisano: {key_path}")
-                else:
-                    QMessageBox.warning(self, "Błąd", f"Nie udało się zaszyfrować pliku: {file_path}")
-
-    # Wybierz plik do zaszyfrowania przez okno dialogowe
-    def select_file_to_encrypt(self):
-        file_path, _ = QFileDialog.getOpenFileName(self, "Wybierz plik do zaszyfrowania", "", "All Files (*)")
-        if not file_path:
-            return
-
-        encrypted_path, key_path = encrypt_file(
-            file_path,
-            compress=True,
-            password="secure_password",
-            use_rsa=False,
-            delete_original=self.delete_original_checkbox.isChecked(),
-        )
-
-        if encrypted_path and os.path.exists(encrypted_path):
-            QMessageBox.information(self, "Sukces", f"Plik zaszyfrowano: {encrypted_path}\nKlucz zapisano: {key_path}")
-        else:
-            QMessageBox.warning(self, "Błąd", f"Nie udało się zaszyfrować pliku: {file_path}")
+    def handle_encrypt_drop(self, files):
+        self.encrypt_paths([file_path for file_path in files if os.path.isfile(file_path)])
+
+    # Wybierz pliki do zaszyfrowania przez okno dialogowe
+    def select_file_to_encrypt(self):
+        file_paths, _ = QFileDialog.getOpenFileNames(self, "Wybierz pliki do zaszyfrowania", "", "All Files (*)")
+        if file_paths:
+            self.encrypt_paths(file_paths)
+
+    # Wsadowe szyfrowanie listy plików w tle z jednym podsumowaniem na końcu.
+    # Na czas szyfrowania pole upuszczania i przyciski szyfrowania są wyłączone.
+    def encrypt_paths(self, file_paths):
+        if not file_paths or not self.encrypt_button.isEnabled():
+            return
+
+        self.set_batch_running(True, len(file_paths))
+        future = self.batch_executor.submit(
+            encrypt_many,
+            file_paths,
+            compress=True,
+            use_rsa=False,
+            delete_original=self.delete_original_checkbox.isChecked(),
+        )
+        self.batch_bridge.watch(future)
+
+    # Zakończenie szyfrowania wsadowego (wywoływane w wątku interfejsu przez sygnał)
+    def on_batch_finished(self, future):
+        self.set_batch_running(False)
+        try:
+            results = future.result()
+        except Exception as e:
+            logging.error(f"Błąd podczas szyfrowania wsadowego: {e}")
+            QMessageBox.warning(self, "Błąd", f"Szyfrowanie wsadowe nie powiodło się: {e}")
+            return
+
+        self.refresh_file_list()
+        self.show_batch_summary(results)
+
+    # Włączenie lub wyłączenie elementów uruchamiających szyfrowanie
+    def set_batch_running(self, running, count=0):
+        self.encrypt_button.setEnabled(not running)
+        self.encrypt_label.setEnabled(not running)
+        self.file_browser.setEnabled(not running)
+        if running:
+            self.encrypt_label.setText(f"Szyfrowanie w toku: {count} plików...")
+        else:
+            self.encrypt_label.setText("Przeciągnij pliki tutaj, aby je zaszyfrować")
+
+    # Podsumowanie szyfrowania wsadowego
+    def show_batch_summary(self, results):
+        failed = [result for result in results if result["error"]]
+        succeeded = len(results) - len(failed)
+        total_bytes = sum(result["bytes"] for result in results if not result["error"])
+        duration = max((result["duration"] for result in results), default=0.0)
+
+        if len(results) == 1 and not failed:
+            QMessageBox.information(
+                self, "Sukces", f"Plik zaszyfrowano: {results[0]['output']}\nKlucz zapisano: {results[0]['key_path']}"
+            )
+            return
+
+        summary = f"Zaszyfrowano plików: {succeeded} z {len(results)} ({total_bytes} bajtów, najdłużej {duration:.2f} s)."
+        if not failed:
+            QMessageBox.information(self, "Sukces", summary)
+            return
+
+        details = "\n".join(f"• {os.path.basename(result['path'])}: {result['error']}" for result in failed[:10])
+        if len(failed) > 10:
+            details += f"\n… oraz {len(failed) - 10} kolejnych."
+        QMessageBox.warning(self, "Błąd", f"{summary}\n\nNie udało się zaszyfrować:\n{details}")
 
     # Otwórz okno dialogowe odszyfrowywania
     def open_decrypt_dialog(self):
@@ -700,7 +443,7 @@ class DecryptDialog(QDialog):
 
     # Załaduj plik klucza
     def load_key(self):
-        key_path, _ = QFileDialog.getOpenFileName(self, "Wybierz plik klucza", "", "Key Files (*.key);;All Files (*)")
+        key_path, _ = QFileDialog.getOpenFileName(self, "Wybierz plik klucza", "", "Key Files (*.key *.pem);;All Files (*)")
         if key_path:
             self.key_path = key_path
             self.key_label.setText(f"Załadowano klucz: {os.path.basename(key_path)}")
@@ -720,7 +463,6 @@ class DecryptDialog(QDialog):
         decrypted_path = decrypt_file(
             self.file_path,
             self.key_path,
-            password="secure_password",
             use_rsa=False,
             delete_keys=self.delete_keys_checkbox.isChecked(),
             delete_encrypted=self.delete_encrypted_checkbox.isChecked()
@@ -0,0 +1,445 @@
+# -*- coding: utf-8 -*-
+# Anonimizacja dokumentów: OCR (Tesseract), rozpoznawanie encji (spaCy) i zamazywanie danych w obrazach.
+# Ciężkie biblioteki (spaCy, OpenCV, Tesseract, pdfplumber, NumPy) są importowane dopiero przy pierwszym użyciu,
+# więc sam import modułu (np. przez interfejs graficzny) nie wydłuża startu programu.
+
+import bisect
+import importlib
+import logging
+import math
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# Ścieżka do Tesseract OCR (jeśli wymagane na Windows)
+TESSERACT_CMD = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+
+
+# Funkcja leniwego importu biblioteki; kolejne wywołania zwracają moduł z sys.modules
+def lazy_import(name):
+    module = importlib.import_module(name)
+    if name == "pytesseract":
+        # Ustawienie ścieżki do Tesseract OCR przy pierwszym użyciu
+        module.pytesseract.tesseract_cmd = TESSERACT_CMD
+    return module
+
+
+# Model NER używany do anonimizacji i składniki potoku spaCy zbędne do rozpoznawania encji
+# (wyłączenie ich skraca wczytywanie modelu i przetwarzanie tekstu)
+NER_MODEL = "ner_model"
+NER_EXCLUDE = ("parser", "tagger", "morphologizer", "lemmatizer", "attribute_ruler", "senter", "textcat")
+
+# Rejestr wczytanych modeli spaCy (jeden egzemplarz każdego modelu na proces)
+NLP_MODELS = {}
+NLP_LOCK = threading.Lock()
+
+
+# Funkcja zwracająca model NER z rejestru; model jest wczytywany z dysku tylko przy pierwszym użyciu
+def get_nlp(name=NER_MODEL):
+    with NLP_LOCK:
+        nlp = NLP_MODELS.get(name)
+        if nlp is None:
+            nlp = lazy_import("spacy").load(name, exclude=list(NER_EXCLUDE))
+            NLP_MODELS[name] = nlp
+            logging.info(f"Wczytano model spaCy {name}: {', '.join(nlp.pipe_names)}")
+        return nlp
+
+
+# Funkcja wstępnie wczytująca modele NER (np. przy starcie programu). Wywołana przed utworzeniem
+# procesów roboczych przez fork sprawia, że procesy potomne dziedziczą gotowe modele zamiast je wczytywać.
+def warm_up(names=(NER_MODEL,)):
+    for name in names:
+        get_nlp(name)("Rozgrzewka modelu.")  # pierwsze wywołanie inicjalizuje bufory potoku
+
+
+# Funkcja do wczytywania tekstu z obrazu (OCR)
+def load_image(file_path):
+    try:
+        cv2 = lazy_import("cv2")
+        pytesseract = lazy_import("pytesseract")
+        image = cv2.imread(file_path)
+        if image is None:
+            raise ValueError("Nie można wczytać obrazu.")
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)  # Konwersja na szarości dla lepszej jakości OCR
+        text = pytesseract.image_to_string(gray, lang='pol')  # OCR na obrazie
+        return text.strip(), image
+    except Exception as e:
+        print(f"Błąd podczas wczytywania obrazu: {e}")
+        return None, None
+
+
+# Tekst rozpoznany przez OCR wraz z ramkami słów. Słowo i leży w tekście w przedziale [starts[i], ends[i]),
+# a jego ramka to boxes[i] = (left, top, width, height) w pikselach obrazu.
+class OcrWords:
+    def __init__(self, text, starts, ends, boxes):
+        self.text = text
+        self.starts = starts
+        self.ends = ends
+        self.boxes = boxes
+
+    # Ramki słów nachodzących na fragment tekstu [start, end) - wyszukiwanie binarne w posortowanych przedziałach
+    def boxes_for_span(self, start, end):
+        first = bisect.bisect_right(self.ends, start)
+        last = bisect.bisect_left(self.starts, end)
+        return self.boxes[first:last]
+
+
+# Funkcja jednego przebiegu OCR (image_to_data): tekst obrazu i ramki słów z ich położeniem w tekście.
+# Słowa jednej linii są łączone spacją, kolejne linie znakiem nowej linii, akapity pustą linią.
+def ocr_words(image):
+    cv2 = lazy_import("cv2")
+    pytesseract = lazy_import("pytesseract")
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)  # Konwersja na szarości dla lepszej jakości OCR
+    data = pytesseract.image_to_data(gray, lang='pol', output_type=pytesseract.Output.DICT)
+
+    parts, starts, ends, boxes = [], [], [], []
+    offset = 0
+    previous_line = None
+    for i, word in enumerate(data["text"]):
+        word = word.strip()
+        if not word:
+            continue
+        line = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+        if previous_line is not None:
+            separator = " " if line == previous_line else "\n" if line[:2] == previous_line[:2] else "\n\n"
+            parts.append(separator)
+            offset += len(separator)
+        previous_line = line
+        starts.append(offset)
+        parts.append(word)
+        offset += len(word)
+        ends.append(offset)
+        boxes.append((data["left"][i], data["top"][i], data["width"][i], data["height"][i]))
+    return OcrWords("".join(parts), starts, ends, boxes)
+
+
+# Funkcja zamazująca ramki: współrzędne są przycinane do obrazu naraz (NumPy), a każda ramka jest
+# zaczerniana przypisaniem do wycinka, więc koszt zależy od łącznej powierzchni ramek, nie od rozmiaru obrazu
+def mask_boxes(image, boxes):
+    if not boxes:
+        return image
+    np = lazy_import("numpy")
+    height, width = image.shape[:2]
+    boxes = np.asarray(boxes, dtype=np.intp)
+    x0 = np.clip(boxes[:, 0], 0, width)
+    y0 = np.clip(boxes[:, 1], 0, height)
+    x1 = np.clip(boxes[:, 0] + boxes[:, 2], 0, width)
+    y1 = np.clip(boxes[:, 1] + boxes[:, 3], 0, height)
+    for left, top, right, bottom in zip(x0.tolist(), y0.tolist(), x1.tolist(), y1.tolist()):
+        image[top:bottom, left:right] = 0
+    return image
+
+
+# Ścieżka obrazu po anonimizacji
+def anonymized_image_path(image_path):
+    return image_path.replace(".png", "_anonimized.png").replace(".jpg", "_anonimized.jpg").replace(".tiff", "_anonimized.tiff")
+
+
+# Funkcja do anonimizacji danych w obrazie: jeden przebieg OCR, encje spaCy odwzorowane na ramki słów
+def anonymize_image(image_path):
+    try:
+        cv2 = lazy_import("cv2")
+        image = cv2.imread(image_path)
+        if image is None:
+            raise ValueError("Nie można przetworzyć obrazu.")
+
+        words = ocr_words(image)
+        doc = get_nlp()(words.text)
+
+        # Ramki słów należących do wykrytych encji
+        boxes = []
+        for ent in doc.ents:
+            boxes.extend(words.boxes_for_span(ent.start_char, ent.end_char))
+        mask_boxes(image, boxes)
+
+        # Zapisanie obrazu z anonimizacją
+        anonymized_path = anonymized_image_path(image_path)
+        cv2.imwrite(anonymized_path, image)
+        return anonymized_path
+    except Exception as e:
+        print(f"Błąd podczas anonimizacji obrazu: {e}")
+        return None
+
+
+# Rozszerzenia obrazów obsługiwanych przez anonimizację (anonymized_image_path)
+IMAGE_EXTENSIONS = (".png", ".jpg", ".tiff")
+
+# Domyślna liczba procesów OCR w trybie wsadowym i liczba tekstów przekazywanych naraz do nlp.pipe
+DEFAULT_OCR_WORKERS = os.cpu_count() or 1
+DEFAULT_NER_BATCH = 32
+
+
+# Funkcja OCR jednego pliku wykonywana w procesie roboczym; zwraca (ścieżka, słowa, czas, błąd).
+# Do procesu głównego wraca tylko tekst i ramki słów, nie cały obraz.
+def ocr_file(image_path):
+    start = time.perf_counter()
+    try:
+        image = lazy_import("cv2").imread(image_path)
+        if image is None:
+            raise ValueError("Nie można wczytać obrazu.")
+        return image_path, ocr_words(image), time.perf_counter() - start, None
+    except Exception as e:
+        return image_path, None, time.perf_counter() - start, str(e) or type(e).__name__
+
+
+# Funkcja zamazująca ramki i zapisująca obraz po anonimizacji (wykonywana w puli wątków)
+def write_anonymized_image(result, boxes):
+    start = time.perf_counter()
+    try:
+        cv2 = lazy_import("cv2")
+        image = cv2.imread(result["path"])
+        if image is None:
+            raise ValueError("Nie można wczytać obrazu.")
+        output = anonymized_image_path(result["path"])
+        if not cv2.imwrite(output, mask_boxes(image, boxes)):
+            raise ValueError(f"Nie można zapisać obrazu: {output}")
+        result["output"] = output
+    except Exception as e:
+        result["error"] = str(e) or type(e).__name__
+    result["write_seconds"] = time.perf_counter() - start
+    return result
+
+
+# Funkcja wsadowej anonimizacji wielu obrazów. OCR działa w puli procesów, teksty trafiają do nlp.pipe
+# partiami po batch_size, a zamazane obrazy są zapisywane równolegle w puli wątków.
+# Zwraca listę wyników (po jednym słowniku na plik, w kolejności wejściowej) z czasami poszczególnych etapów.
+def anonymize_many(paths, workers=DEFAULT_OCR_WORKERS, batch_size=DEFAULT_NER_BATCH, progress=None):
+    paths = list(paths)
+    logging.info(f"Rozpoczęto wsadową anonimizację {len(paths)} obrazów (procesy OCR: {workers}, partie NER po {batch_size})")
+    nlp = get_nlp()  # model wczytany przed utworzeniem procesów (fork) i przed pierwszą partią
+    results = []
+
+    def finish(future):
+        if progress is not None:
+            progress(future.result())
+
+    def process_batch(batch, writer):
+        start = time.perf_counter()
+        docs = list(nlp.pipe([words.text for _, words in batch], batch_size=batch_size))
+        ner_seconds = (time.perf_counter() - start) / len(batch)
+        for (result, words), doc in zip(batch, docs):
+            result["ner_seconds"] = ner_seconds
+            result["entities"] = len(doc.ents)
+            boxes = []
+            for ent in doc.ents:
+                boxes.extend(words.boxes_for_span(ent.start_char, ent.end_char))
+            writer.submit(write_anonymized_image, result, boxes).add_done_callback(finish)
+
+    with ProcessPoolExecutor(max_workers=max(1, workers)) as ocr_pool, \
+            ThreadPoolExecutor(max_workers=max(1, workers)) as writer:
+        batch = []
+        for path, words, ocr_seconds, error in ocr_pool.map(ocr_file, paths):
+            result = {
+                "path": path, "output": None, "entities": 0, "ocr_seconds": ocr_seconds,
+                "ner_seconds": 0.0, "write_seconds": 0.0, "error": error,
+            }
+            results.append(result)
+            if error is not None:
+                if progress is not None:
+                    progress(result)
+                continue
+            batch.append((result, words))
+            if len(batch) == batch_size:
+                process_batch(batch, writer)
+                batch = []
+        if batch:
+            process_batch(batch, writer)
+
+    failed = sum(1 for result in results if result["error"])
+    logging.info(f"Zakończono wsadową anonimizację: {len(results) - failed} udanych, {failed} błędów")
+    return results
+
+
+# Parametry potoku PDF: liczba stron przetwarzanych przez jedno zadanie procesu roboczego
+# (jedno otwarcie dokumentu na zadanie) i rozdzielczość rasteryzacji stron
+PDF_PAGES_PER_TASK = 8
+PDF_OCR_RESOLUTION = 300
+PDF_POINTS_PER_INCH = 72
+
+# Progi wykrywania stron wymagających OCR: udział znaków bez mapowania Unicode ("(cid:N)"),
+# minimalna liczba znaków na stronie zajętej głównie przez obraz (skan z nagłówkiem lub stopką)
+PDF_MAX_CID_RATIO = 0.3
+PDF_MIN_CHARS_ON_SCAN = 20
+PDF_SCAN_IMAGE_COVERAGE = 0.5
+PDF_LINE_TOLERANCE = 3
+
+
+# Funkcja zastępująca encje w tekście etykietami, np. "[PERSON]"
+def redact_text(text, doc):
+    parts = []
+    offset = 0
+    for ent in doc.ents:
+        parts.append(text[offset:ent.start_char])
+        parts.append(f"[{ent.label_}]")
+        offset = ent.end_char
+    parts.append(text[offset:])
+    return "".join(parts)
+
+
+# Ścieżka obrazu strony PDF po anonimizacji
+def anonymized_page_path(pdf_path, page_number):
+    return f"{os.path.splitext(pdf_path)[0]}_anonimized_p{page_number:04d}.png"
+
+
+# Funkcja sprawdzająca, czy strona wymaga OCR: brak warstwy tekstowej, tekst bez mapowania znaków
+# albo strona będąca w większości obrazem z pojedynczymi znakami tekstu
+def page_needs_ocr(page):
+    chars = page.chars
+    if not chars:
+        return True
+    unmapped = sum(1 for char in chars if char["text"].startswith("(cid:"))
+    if unmapped / len(chars) > PDF_MAX_CID_RATIO:
+        return True
+    if len(chars) < PDF_MIN_CHARS_ON_SCAN:
+        page_area = float(page.width * page.height) or 1.0
+        image_area = sum(float(image["width"] * image["height"]) for image in page.images)
+        return image_area / page_area >= PDF_SCAN_IMAGE_COVERAGE
+    return False
+
+
+# Funkcja budująca indeks znaków strony z warstwy tekstowej PDF (bez OCR). Każdy znak ma własną ramkę
+# w pikselach obrazu strony renderowanego w danej rozdzielczości, więc encja zamazuje dokładnie swoje znaki.
+def pdf_page_words(page, resolution=PDF_OCR_RESOLUTION):
+    scale = resolution / PDF_POINTS_PER_INCH
+    left, top = float(page.bbox[0]), float(page.bbox[1])
+
+    def pixel_box(item):
+        x0 = math.floor((float(item["x0"]) - left) * scale)
+        y0 = math.floor((float(item["top"]) - top) * scale)
+        x1 = math.ceil((float(item["x1"]) - left) * scale)
+        y1 = math.ceil((float(item["bottom"]) - top) * scale)
+        return x0, y0, x1 - x0, y1 - y0
+
+    parts, starts, ends, boxes = [], [], [], []
+    offset = 0
+    previous = None
+    for word in page.extract_words(return_chars=True):
+        if previous is not None:
+            separator = " " if abs(float(word["top"]) - float(previous["top"])) <= PDF_LINE_TOLERANCE else "\n"
+            parts.append(separator)
+            offset += len(separator)
+        previous = word
+        parts.append(word["text"])
+        chars = word.get("chars", [])
+        if len(chars) == len(word["text"]):
+            for position, char in enumerate(chars):
+                starts.append(offset + position)
+                ends.append(offset + position + 1)
+                boxes.append(pixel_box(char))
+        else:
+            # Ligatury i znaki złożone: ramka całego słowa
+            starts.append(offset)
+            ends.append(offset + len(word["text"]))
+            boxes.append(pixel_box(word))
+        offset += len(word["text"])
+    return OcrWords("".join(parts), starts, ends, boxes)
+
+
+# Funkcja renderująca stronę PDF do obrazu w formacie OpenCV (BGR)
+def render_page(page, resolution):
+    np = lazy_import("numpy")
+    rendered = page.to_image(resolution=resolution).original.convert("RGB")
+    return np.ascontiguousarray(np.asarray(rendered)[:, :, ::-1])  # RGB -> BGR (OpenCV)
+
+
+# Funkcja anonimizacji strony PDF. Strony z warstwą tekstową korzystają ze współrzędnych znaków
+# (bez Tesseract); strony wymagające OCR są rasteryzowane i rozpoznawane. Obraz strony z zamazanymi
+# encjami jest zapisywany zawsze dla stron z OCR, a dla stron tekstowych tylko w trybie redact.
+def anonymize_page(pdf_path, page, page_number, nlp, resolution, redact=False, force_ocr=False):
+    method = "ocr" if force_ocr or page_needs_ocr(page) else "text"
+    image = None
+    if method == "ocr":
+        image = render_page(page, resolution)
+        words = ocr_words(image)
+    else:
+        words = pdf_page_words(page, resolution)
+    doc = nlp(words.text)
+
+    output = None
+    if method == "ocr" or redact:
+        if image is None:
+            image = render_page(page, resolution)
+        boxes = []
+        for ent in doc.ents:
+            boxes.extend(words.boxes_for_span(ent.start_char, ent.end_char))
+        output = anonymized_page_path(pdf_path, page_number)
+        if not lazy_import("cv2").imwrite(output, mask_boxes(image, boxes)):
+            raise ValueError(f"Nie można zapisać obrazu: {output}")
+    return method, words.text, doc, output
+
+
+# Funkcja odczytu liczby stron z drzewa stron dokumentu. Korzysta bezpośrednio z pdfminer: pdfplumber tworzy
+# obiekty Page dla wszystkich stron już przy zamykaniu dokumentu.
+def pdf_page_count(pdf_path):
+    PDFParser = lazy_import("pdfminer.pdfparser").PDFParser
+    PDFDocument = lazy_import("pdfminer.pdfdocument").PDFDocument
+    resolve1 = lazy_import("pdfminer.pdftypes").resolve1
+    with open(pdf_path, "rb") as f:
+        document = PDFDocument(PDFParser(f))
+        return resolve1(resolve1(document.catalog["Pages"])["Count"])
+
+
+# Zadanie procesu roboczego: anonimizacja zakresu stron [first, last) jednego dokumentu.
+# Dokument jest otwierany tylko z tym zakresem stron, a pamięć podręczna każdej strony jest zwalniana
+# po jej przetworzeniu.
+def anonymize_pdf_pages(pdf_path, first, last, resolution=PDF_OCR_RESOLUTION, redact=False, force_ocr=False):
+    pdfplumber = lazy_import("pdfplumber")
+    nlp = get_nlp()
+    results = []
+    with pdfplumber.open(pdf_path, pages=range(first + 1, last + 1)) as pdf:
+        for page in pdf.pages:
+            start = time.perf_counter()
+            page_number = page.page_number
+            result = {"page": page_number, "method": None, "text": "", "entities": 0, "output": None,
+                      "seconds": 0.0, "error": None}
+            try:
+                result["method"], text, doc, result["output"] = anonymize_page(
+                    pdf_path, page, page_number, nlp, resolution, redact, force_ocr
+                )
+                result["text"] = redact_text(text, doc)
+                result["entities"] = len(doc.ents)
+            except Exception as e:
+                result["error"] = str(e) or type(e).__name__
+            finally:
+                page.close()
+            result["seconds"] = time.perf_counter() - start
+            results.append(result)
+    return results
+
+
+# Funkcja anonimizacji dokumentu PDF. Zakresy stron są przetwarzane równolegle w puli procesów; strony
+# z warstwą tekstową idą bezpośrednio do NER, a rasteryzacja i OCR są używane tylko dla stron, które
+# tego wymagają (page_needs_ocr). Zanonimizowany tekst jest zapisywany strona po stronie (strony
+# rozdzielone znakiem \f) do pliku <nazwa>_anonimized.txt, obrazy stron z zamazanymi encjami do plików
+# <nazwa>_anonimized_pNNNN.png (w trybie redact także dla stron z warstwą tekstową).
+# Zwraca słownik z wynikami stron (bez ich tekstu).
+def anonymize_pdf(pdf_path, workers=DEFAULT_OCR_WORKERS, pages_per_task=PDF_PAGES_PER_TASK,
+                  resolution=PDF_OCR_RESOLUTION, progress=None, redact=False, force_ocr=False):
+    page_count = pdf_page_count(pdf_path)
+    logging.info(f"Rozpoczęto anonimizację PDF {pdf_path}: {page_count} stron (procesy: {workers})")
+    get_nlp()  # model wczytany przed utworzeniem procesów (fork)
+
+    output = os.path.splitext(pdf_path)[0] + "_anonimized.txt"
+    ranges = [(first, min(first + pages_per_task, page_count)) for first in range(0, page_count, pages_per_task)]
+    pages = []
+    with ProcessPoolExecutor(max_workers=max(1, workers)) as executor, open(output, "w", encoding="utf-8") as f:
+        tasks = executor.map(
+            anonymize_pdf_pages, [pdf_path] * len(ranges), [first for first, _ in ranges],
+            [last for _, last in ranges], [resolution] * len(ranges), [redact] * len(ranges),
+            [force_ocr] * len(ranges),
+        )
+        # Wyniki zakresów przychodzą w kolejności stron, więc tekst można zapisywać od razu
+        for results in tasks:
+            for result in results:
+                if result["page"] > 1:
+                    f.write("\f")
+                f.write(result.pop("text"))
+                pages.append(result)
+                if progress is not None:
+                    progress(result)
+
+    failed = sum(1 for page in pages if page["error"])
+    scanned = sum(1 for page in pages if page["method"] == "ocr")
+    logging.info(f"Zakończono anonimizację PDF {pdf_path}: stron z OCR {scanned}, błędów {failed}")
+    return {"path": pdf_path, "output": output, "pages": pages}
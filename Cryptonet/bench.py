@@ -0,0 +1,348 @@
+# -*- coding: utf-8 -*-
+# Pomiary wydajności operacji na plikach Cryptonet
+
+import builtins
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import core
+
+
+# Obiekt pliku zliczający odczytane bajty
+class CountingFile:
+    def __init__(self, f, counter):
+        self._f = f
+        self._counter = counter
+
+    def read(self, size=-1):
+        data = self._f.read(size)
+        self._counter["bytes_read"] += len(data)
+        return data
+
+    def readinto(self, buffer):
+        size = self._f.readinto(buffer)
+        self._counter["bytes_read"] += size or 0
+        return size
+
+    def __getattr__(self, name):
+        return getattr(self._f, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._f.close()
+
+
+# Podmiana funkcji open w modułach na wersję zliczającą bajty odczytane z plików
+@contextmanager
+def count_reads(*modules):
+    counter = {"bytes_read": 0}
+
+    def counting_open(path, mode="r", *args, **kwargs):
+        f = builtins.open(path, mode, *args, **kwargs)
+        if "r" in mode and "b" in mode:
+            return CountingFile(f, counter)
+        return f
+
+    for module in modules:
+        module.open = counting_open
+    try:
+        yield counter
+    finally:
+        for module in modules:
+            del module.open
+
+
+# Odtworzenie dawnej ścieżki: odczyt całego pliku do szyfrowania, a potem ponowny odczyt w generate_file_id
+def legacy_encrypt_reads(file_path):
+    with open(file_path, "rb") as f:
+        f.read()
+    core.generate_file_id(file_path)
+
+
+# Porównanie liczby odczytanych bajtów i czasu: dawna ścieżka dwuprzebiegowa vs jednoprzebiegowe encrypt_file
+def bench_encrypt_reads(file_path, chunk_size=core.CHUNK_SIZE):
+    file_size = os.path.getsize(file_path)
+
+    with count_reads(core, sys.modules[__name__]) as legacy:
+        start = time.perf_counter()
+        legacy_encrypt_reads(file_path)
+        legacy_seconds = time.perf_counter() - start
+
+    with count_reads(core) as fused:
+        start = time.perf_counter()
+        encrypted_path, key_path = core.encrypt_file(file_path, chunk_size=chunk_size)
+        fused_seconds = time.perf_counter() - start
+
+    for path in (encrypted_path, encrypted_path and encrypted_path + ".hmac", key_path):
+        if path and os.path.exists(path):
+            os.remove(path)
+
+    return {
+        "file_size": file_size,
+        "legacy_bytes_read": legacy["bytes_read"],
+        "fused_bytes_read": fused["bytes_read"],
+        "read_ratio": fused["bytes_read"] / legacy["bytes_read"] if legacy["bytes_read"] else 0.0,
+        "legacy_read_seconds": legacy_seconds,
+        "fused_encrypt_seconds": fused_seconds,
+    }
+
+
+# Przepustowość encrypt_file (MiB/s) dla różnej liczby wątków
+def bench_parallel_encrypt(file_path, workers_list=(1, 2, 4, 8), chunk_size=core.CHUNK_SIZE):
+    file_size = os.path.getsize(file_path)
+    results = {}
+    for workers in workers_list:
+        start = time.perf_counter()
+        encrypted_path, key_path = core.encrypt_file(file_path, chunk_size=chunk_size, workers=workers)
+        elapsed = time.perf_counter() - start
+        for path in (encrypted_path, key_path):
+            if path and os.path.exists(path):
+                os.remove(path)
+        results[workers] = file_size / (1024 * 1024) / elapsed if elapsed else 0.0
+    return results
+
+
+# Szczytowa pamięć (tracemalloc) zaalokowana w pętli szyfrowania: bufory z puli vs nowe obiekty bytes na porcję.
+# Przy buforach z puli szczyt nie zależy od rozmiaru porcji i jest o rzędy wielkości mniejszy.
+def bench_chunk_allocations(chunk_size=core.CHUNK_SIZE, chunks=16):
+    source = io.BytesIO(os.urandom(chunk_size * chunks + 1))
+    key = os.urandom(32)
+    nonce_prefix = os.urandom(core.NONCE_PREFIX_SIZE)
+    header = core.build_container_header(chunk_size, nonce_prefix)
+    buffers = core.BufferPool()
+
+    def pooled():
+        source.seek(0)
+        core.encrypt_segments(
+            source, core.NullWriter(), key, nonce_prefix, header, chunk_size, buffers=buffers
+        )
+
+    def allocating():
+        source.seek(0)
+        index = 0
+        while chunk := source.read(chunk_size):
+            core.NullWriter().write(core.encrypt_segment(key, nonce_prefix, index, False, header, chunk))
+            index += 1
+
+    results = {"chunk_size": chunk_size, "chunks": chunks}
+    for name, run in (("pooled", pooled), ("allocating", allocating)):
+        run()  # rozgrzewka: wypełnienie puli buforów
+        tracemalloc.start()
+        try:
+            run()
+            results[f"{name}_peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return results
+
+
+# Czas opakowania kluczy plików dla odbiorcy RSA: klucz publiczny wczytywany przy każdym pliku
+# vs klucz z pamięci podręcznej load_public_key (jak w encrypt_many z listą odbiorców).
+def bench_recipient_keys(files=1000):
+    with tempfile.TemporaryDirectory() as directory:
+        public_key_path = os.path.join(directory, "recipient.pem")
+        core.generate_rsa_keypair(os.path.join(directory, "private.pem"), public_key_path)
+
+        def reloading():
+            with open(public_key_path, "rb") as f:
+                public_key = core.serialization.load_pem_public_key(f.read())
+            core.wrap_recipient_key(core.public_key_id(public_key), public_key, os.urandom(32))
+
+        def cached():
+            key_id, public_key = core.load_public_key(public_key_path)
+            core.wrap_recipient_key(key_id, public_key, os.urandom(32))
+
+        results = {"files": files}
+        for name, run in (("reloading", reloading), ("cached", cached)):
+            start = time.perf_counter()
+            for _ in range(files):
+                run()
+            results[f"{name}_seconds"] = time.perf_counter() - start
+    return results
+
+
+# Dawna ścieżka logowania: wczytanie całego users.json i liniowe przeszukanie kont
+def legacy_find_user(json_path, username):
+    import json
+    with open(json_path, "r") as f:
+        data = json.load(f)
+    for user in data["users"]:
+        if user["username"].lower() == username.lower():
+            return user
+    return None
+
+
+# Czas wyszukania konta (ms na wyszukanie): users.json przeszukiwany liniowo vs indeks SQLite.
+# Konta testowe mają sztuczne skróty haseł, więc pomiar nie obejmuje kosztu PBKDF2.
+def bench_user_store(users=20000, lookups=200):
+    import json
+    with tempfile.TemporaryDirectory() as directory:
+        json_path = os.path.join(directory, "users.json")
+        records = [
+            {"username": f"user{i}", "email": f"user{i}@example.com", "password_hash": "00" * 32}
+            for i in range(users)
+        ]
+        with open(json_path, "w") as f:
+            json.dump({"users": records}, f)
+        store = core.SqliteUserStore(os.path.join(directory, "users.db"))
+        start = time.perf_counter()
+        store.migrate_from_json(json_path)
+        migration_seconds = time.perf_counter() - start
+
+        names = [f"USER{users - 1 - i % users}" for i in range(lookups)]
+        results = {"users": users, "migration_seconds": migration_seconds}
+        for name, find in (("json", lambda n: legacy_find_user(json_path, n)), ("sqlite", store.get_user)):
+            start = time.perf_counter()
+            for username in names:
+                assert find(username) is not None
+            results[f"{name}_lookup_ms"] = (time.perf_counter() - start) * 1000 / lookups
+        store.connect().close()
+    return results
+
+
+# Przepustowość logowań (logowania/s): kolejno w jednym wątku vs równolegle przez AuthService
+def bench_auth_service(logins=32, workers=core.DEFAULT_AUTH_WORKERS):
+    with tempfile.TemporaryDirectory() as directory:
+        store = core.SqliteUserStore(os.path.join(directory, "users.db"))
+        core.register_user("bench", "Bench-password-1", store=store)
+
+        start = time.perf_counter()
+        for _ in range(logins):
+            assert core.login_user("bench", "Bench-password-1", store=store)
+        sequential_seconds = time.perf_counter() - start
+
+        service = core.AuthService(workers, store)
+        start = time.perf_counter()
+        futures = [service.login("bench", "Bench-password-1") for _ in range(logins)]
+        assert all(future.result() for future in futures)
+        pooled_seconds = time.perf_counter() - start
+        service.shutdown()
+    return {
+        "logins": logins,
+        "workers": workers,
+        "sequential_per_second": logins / sequential_seconds,
+        "pooled_per_second": logins / pooled_seconds,
+    }
+
+
+# Opóźnienie rozpoznawania encji na jeden obraz (ms): spacy.load przy każdym obrazie (dawna ścieżka)
+# vs model z rejestru anonymize.get_nlp
+def bench_ner_latency(text, model=None, images=5):
+    import anonymize
+    model = model or anonymize.NER_MODEL
+    spacy = anonymize.lazy_import("spacy")
+
+    start = time.perf_counter()
+    for _ in range(images):
+        spacy.load(model)(text)
+    reload_ms = (time.perf_counter() - start) * 1000 / images
+
+    start = time.perf_counter()
+    anonymize.warm_up((model,))
+    warm_up_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    for _ in range(images):
+        anonymize.get_nlp(model)(text)
+    cached_ms = (time.perf_counter() - start) * 1000 / images
+    return {"model": model, "reload_ms_per_image": reload_ms, "warm_up_ms": warm_up_ms, "cached_ms_per_image": cached_ms}
+
+
+# Czas przypisania ramek do encji (ms): dawne przeszukiwanie wszystkich ramek dla każdej encji
+# vs wyszukiwanie binarne w indeksie anonymize.OcrWords. Dane syntetyczne, bez uruchamiania OCR.
+def bench_entity_boxes(words=20000, entities=500):
+    import anonymize
+    starts, ends, boxes = [], [], []
+    for i in range(words):
+        starts.append(i * 8)
+        ends.append(i * 8 + 7)
+        boxes.append((i % 100 * 10, i // 100 * 12, 9, 11))
+    text = " ".join(f"slowo{i % 100:02d}" for i in range(words))
+    index = anonymize.OcrWords(text, starts, ends, boxes)
+    spans = [(i * words // entities * 8, i * words // entities * 8 + 15) for i in range(entities)]
+
+    start = time.perf_counter()
+    for span_start, span_end in spans:
+        entity = text[span_start:span_end]
+        [box for box, word_start, word_end in zip(boxes, starts, ends) if text[word_start:word_end] in entity]
+    scan_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    for span_start, span_end in spans:
+        index.boxes_for_span(span_start, span_end)
+    index_ms = (time.perf_counter() - start) * 1000
+    return {"words": words, "entities": entities, "scan_ms": scan_ms, "index_ms": index_ms}
+
+
+# Czas zamazania strony PDF (ms na stronę): współrzędne znaków z warstwy tekstowej vs rasteryzacja i OCR.
+# Mierzone w jednym procesie na pierwszych stronach dokumentu; obrazy wynikowe są usuwane.
+def bench_pdf_redaction(pdf_path, pages=5, resolution=None):
+    import anonymize
+    resolution = resolution or anonymize.PDF_OCR_RESOLUTION
+    pages = min(pages, anonymize.pdf_page_count(pdf_path))
+    anonymize.warm_up()
+
+    results = {"pages": pages}
+    for name, force_ocr in (("text", False), ("ocr", True)):
+        start = time.perf_counter()
+        page_results = anonymize.anonymize_pdf_pages(pdf_path, 0, pages, resolution, redact=True, force_ocr=force_ocr)
+        results[f"{name}_ms_per_page"] = (time.perf_counter() - start) * 1000 / max(1, pages)
+        results[f"{name}_methods"] = sorted({page["method"] for page in page_results})
+        for page in page_results:
+            if page["output"] and os.path.exists(page["output"]):
+                os.remove(page["output"])
+    return results
+
+
+# Biblioteki, które nie powinny być wczytywane przy samym imporcie modułów Cryptonet
+HEAVY_MODULES = ("PyQt6", "spacy", "cv2", "pytesseract", "pdfplumber", "numpy")
+
+
+# Czas importu modułu (python -X importtime w nowym procesie) i ciężkie biblioteki wczytane przy imporcie.
+# Niepusta lista heavy_modules oznacza regresję leniwego ładowania.
+def bench_import_time(module="core"):
+    code = f"import sys, {module}; print(','.join(name for name in {HEAVY_MODULES!r} if name in sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True,
+    )
+    cumulative_us = 0
+    for line in result.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2].strip() == module:
+            cumulative_us = int(parts[1])
+    heavy_modules = [name for name in result.stdout.strip().split(",") if name]
+    return {"module": module, "import_ms": cumulative_us / 1000, "heavy_modules": heavy_modules}
+
+
+if __name__ == "__main__":
+    # Pomiary RSA, bazy użytkowników i logowania są kosztowne, więc uruchamiane tylko na żądanie
+    options = set(sys.argv[2:])
+    if len(sys.argv) < 2 or not options <= {"--rsa", "--users", "--auth"}:
+        print("Użycie: python bench.py <plik> [--rsa] [--users] [--auth]")
+        sys.exit(2)
+    for name, value in bench_encrypt_reads(sys.argv[1]).items():
+        print(f"{name}: {value}")
+    for workers, throughput in bench_parallel_encrypt(sys.argv[1]).items():
+        print(f"workers={workers}: {throughput:.1f} MiB/s")
+    for name, value in bench_chunk_allocations().items():
+        print(f"{name}: {value}")
+    if "--rsa" in options:
+        for name, value in bench_recipient_keys().items():
+            print(f"{name}: {value}")
+    if "--users" in options:
+        for name, value in bench_user_store().items():
+            print(f"{name}: {value}")
+    if "--auth" in options:
+        for name, value in bench_auth_service().items():
+            print(f"{name}: {value}")
+    for module in ("core", "anonymize", "cli"):
+        result = bench_import_time(module)
+        print(f"import {module}: {result['import_ms']:.1f} ms, ciężkie biblioteki: {result['heavy_modules'] or 'brak'}")
@@ -0,0 +1,340 @@
+# -*- coding: utf-8 -*-
+# Interfejs wiersza poleceń Cryptonet: cryptonet encrypt|decrypt|verify|keygen|migrate-passwords|anonymize|bench.
+# Przy imporcie korzysta wyłącznie z modułu core; moduł anonymize jest wczytywany dopiero przez polecenie anonymize.
+
+import argparse
+import getpass
+import json
+import logging
+import os
+import sys
+
+import core
+
+
+# Funkcja odczytu opcji --compress: bez wartości oznacza algorytm domyślny
+def compression_option(value):
+    if value not in core.COMPRESSION_ALGORITHMS:
+        raise argparse.ArgumentTypeError(f"nieobsługiwany algorytm kompresji: {value}")
+    return value
+
+
+# Funkcja pobierająca hasło z terminala, jeśli podano opcję --password
+def read_password(args):
+    return getpass.getpass("Hasło: ") if args.password else None
+
+
+# Funkcja zwracająca opcje podane razem ze ścieżką "-", których strumień nie obsługuje (zamiast je pomijać).
+# Wartości domyślne opcji: None, False, pusta lista albo tryb wejścia/wyjścia "stream".
+def unsupported_stream_options(args, names):
+    return ["--" + name.replace("_", "-") for name in names if getattr(args, name) not in (None, False, [], "stream")]
+
+
+# Polecenie encrypt: pliki (wsadowo) albo strumień stdin -> stdout dla ścieżki "-"
+def command_encrypt(args):
+    if args.paths == ["-"]:
+        unsupported = unsupported_stream_options(
+            args, ("password", "recipient", "legacy", "io_mode", "delete_original")
+        )
+        if unsupported:
+            print(f"Szyfrowanie strumienia nie obsługuje opcji: {', '.join(unsupported)}", file=sys.stderr)
+            return 2
+        if args.key is None:
+            print("Szyfrowanie strumienia wymaga opcji --key.", file=sys.stderr)
+            return 2
+        core.encrypt_stream(sys.stdin.buffer, sys.stdout.buffer, args.key, args.compress, args.chunk_size)
+        return 0
+
+    options = {
+        "compress": args.compress,
+        "delete_original": args.delete_original,
+        "chunk_size": args.chunk_size,
+        "format_version": core.FORMAT_LEGACY if args.legacy else core.FORMAT_SEGMENTED,
+        "io_mode": args.io_mode,
+        "key_path": args.key,
+        "password": read_password(args),
+        "recipients": args.recipient,
+    }
+    if len(args.paths) == 1:
+        # Pojedynczy plik: wątki szyfrują segmenty tego pliku
+        result = {"path": args.paths[0], "output": None, "error": None}
+        try:
+            result["output"], _ = core.encrypt_file(args.paths[0], workers=args.workers, raise_errors=True, **options)
+        except Exception as e:
+            result["error"] = str(e) or type(e).__name__
+        results = [result]
+    else:
+        # Wiele plików: wątki szyfrują jednocześnie różne pliki
+        results = core.encrypt_many(args.paths, workers=args.workers, **options)
+
+    failed = 0
+    for result in results:
+        if result["error"]:
+            failed += 1
+            print(f"{result['path']}: {result['error']}", file=sys.stderr)
+        else:
+            print(result["output"])
+    return 1 if failed else 0
+
+
+# Polecenie decrypt: plik .enc albo strumień stdin -> stdout dla ścieżki "-"
+def command_decrypt(args):
+    if args.path == "-":
+        unsupported = unsupported_stream_options(args, ("output", "delete_keys", "delete_encrypted", "io_mode"))
+        if unsupported:
+            print(f"Odszyfrowanie strumienia nie obsługuje opcji: {', '.join(unsupported)}", file=sys.stderr)
+            return 2
+    password = read_password(args)
+    if args.path == "-":
+        if args.key is None and password is None:
+            print("Odszyfrowanie strumienia wymaga opcji --key albo --password.", file=sys.stderr)
+            return 2
+        core.decrypt_stream(sys.stdin.buffer, sys.stdout.buffer, args.key, args.chunk_size, password=password)
+        return 0
+
+    key_path = args.key or (None if password is not None else core.default_key_path(args.path))
+    result = core.decrypt_file(
+        args.path, key_path, password=password, delete_keys=args.delete_keys,
+        delete_encrypted=args.delete_encrypted, chunk_size=args.chunk_size, workers=args.workers,
+        io_mode=args.io_mode, output_path=args.output,
+    )
+    if result != (args.output or core.decrypted_file_path(args.path)):
+        print(f"{args.path}: {result}", file=sys.stderr)
+        return 1
+    print(result)
+    return 0
+
+
+# Polecenie verify: pliki i katalogi (katalogi są sprawdzane równolegle przez verify_tree)
+def command_verify(args):
+    password = read_password(args)
+    results = []
+    for path in args.paths:
+        if os.path.isdir(path):
+            results.extend(core.verify_tree(path, workers=args.workers, key_path=args.key))
+            continue
+        result = {"path": path, "status": "error", "error": None}
+        try:
+            key_path = core.default_key_path(path)
+            if not os.path.isfile(key_path) and args.key is not None:
+                key_path = args.key
+            if not os.path.isfile(key_path) and password is not None:
+                key_path = None
+            result["status"] = "ok" if core.verify_file(path, key_path, password=password) else "corrupt"
+        except Exception as e:
+            result["error"] = str(e) or type(e).__name__
+        results.append(result)
+
+    if args.report is not None:
+        with open(args.report, "w", encoding="utf-8") as f:
+            for result in results:
+                f.write(json.dumps(result, ensure_ascii=False) + "\n")
+    for result in results:
+        line = f"{result['status']}\t{result['path']}"
+        if result["error"]:
+            line += f"\t{result['error']}"
+        print(line)
+    return 0 if all(result["status"] == "ok" for result in results) else 1
+
+
+# Polecenie keygen: para kluczy RSA odbiorcy (klucz publiczny dla --recipient, prywatny dla --key)
+# albo klucz główny (--master) dla encrypt/decrypt/verify --key
+def command_keygen(args):
+    if args.master is not None:
+        if args.private_key or args.public_key or args.password:
+            print("Opcji --master nie łączy się z plikami kluczy RSA ani z --password.", file=sys.stderr)
+            return 2
+        print(core.create_master_key(args.master))
+        return 0
+    if args.public_key is None:
+        print("Podaj pliki klucza prywatnego i publicznego albo opcję --master.", file=sys.stderr)
+        return 2
+    password = read_password(args)
+    core.generate_rsa_keypair(args.private_key, args.public_key, password, args.bits)
+    print(args.private_key)
+    print(args.public_key)
+    return 0
+
+
+# Polecenie migrate-passwords: masowa aktualizacja skrótów haseł z pliku importu (JSON Lines)
+def command_migrate_passwords(args):
+    def progress(summary):
+        print(f"przetworzono {summary['processed']}: zaktualizowano {summary['upgraded']}, "
+              f"błędne hasła {summary['mismatch']}, brak konta {summary['missing']}", file=sys.stderr)
+
+    store = core.SqliteUserStore(args.db)
+    store.migrate_from_json(core.USERS_JSON)
+    summary = core.migrate_passwords(
+        args.feed, store, workers=args.workers, batch_size=args.batch_size,
+        checkpoint_path=args.checkpoint, progress=progress,
+    )
+    print(json.dumps(summary, ensure_ascii=False))
+    return 1 if summary["errors"] else 0
+
+
+# Polecenie anonymize: wsadowa anonimizacja obrazów i dokumentów PDF (katalogi są przeszukiwane rekurencyjnie)
+def command_anonymize(args):
+    import anonymize
+
+    paths = []
+    for path in args.paths:
+        if os.path.isdir(path):
+            paths.extend(
+                p for p in core.iter_tree_files(path)
+                if p.lower().endswith((*anonymize.IMAGE_EXTENSIONS, ".pdf")) and "_anonimized" not in p
+            )
+        else:
+            paths.append(path)
+    images = [path for path in paths if not path.lower().endswith(".pdf")]
+    results = anonymize.anonymize_many(images, workers=args.workers, batch_size=args.batch_size) if images else []
+    for path in paths:
+        if path.lower().endswith(".pdf"):
+            result = {"path": path, "output": None, "error": None}
+            try:
+                result.update(anonymize.anonymize_pdf(path, workers=args.workers, redact=args.redact))
+                errors = [f"strona {page['page']}: {page['error']}" for page in result["pages"] if page["error"]]
+                result["error"] = "; ".join(errors) or None
+            except Exception as e:
+                result["error"] = str(e) or type(e).__name__
+            results.append(result)
+
+    if args.report is not None:
+        with open(args.report, "w", encoding="utf-8") as f:
+            for result in results:
+                f.write(json.dumps(result, ensure_ascii=False) + "\n")
+    failed = 0
+    for result in results:
+        if result["error"]:
+            failed += 1
+            print(f"{result['path']}: {result['error']}", file=sys.stderr)
+        else:
+            print(result["output"])
+    return 1 if failed else 0
+
+
+# Polecenie bench: pomiary z modułu bench dla wskazanego pliku
+def command_bench(args):
+    import bench
+
+    for name, value in bench.bench_encrypt_reads(args.path, args.chunk_size).items():
+        print(f"{name}: {value}")
+    for workers, throughput in bench.bench_parallel_encrypt(args.path, args.workers, args.chunk_size).items():
+        print(f"workers={workers}: {throughput:.1f} MiB/s")
+    for name, value in bench.bench_chunk_allocations(args.chunk_size).items():
+        print(f"{name}: {value}")
+    if args.rsa:
+        for name, value in bench.bench_recipient_keys().items():
+            print(f"{name}: {value}")
+    if args.users:
+        for name, value in bench.bench_user_store().items():
+            print(f"{name}: {value}")
+    if args.auth:
+        for name, value in bench.bench_auth_service().items():
+            print(f"{name}: {value}")
+    for name, value in bench.bench_entity_boxes().items():
+        print(f"{name}: {value}")
+    if args.ner_model:
+        with open(args.path, "r", encoding="utf-8", errors="replace") as f:
+            text = f.read(100000)
+        for name, value in bench.bench_ner_latency(text, args.ner_model).items():
+            print(f"{name}: {value}")
+    if args.pdf:
+        for name, value in bench.bench_pdf_redaction(args.pdf).items():
+            print(f"{name}: {value}")
+    for module in ("core", "anonymize", "cli"):
+        result = bench.bench_import_time(module)
+        print(f"import {module}: {result['import_ms']:.1f} ms, ciężkie biblioteki: {result['heavy_modules'] or 'brak'}")
+    return 0
+
+
+# Budowa parsera argumentów wiersza poleceń
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cryptonet", description="Szyfrowanie i weryfikacja plików Cryptonet.")
+    parser.add_argument("--log", default="operations.log", help="plik dziennika operacji")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    encrypt = subparsers.add_parser("encrypt", help="szyfrowanie plików albo strumienia (-)")
+    encrypt.add_argument("paths", nargs="+", help="pliki do zaszyfrowania; - oznacza stdin -> stdout")
+    encrypt.add_argument("--key", help="klucz główny z keygen --master (jeden plik .enc bez pliku .key) "
+                                       "albo nowy plik .key dla strumienia")
+    encrypt.add_argument("--compress", nargs="?", const=True, default=False, type=compression_option,
+                         help="kompresja przed szyfrowaniem (zlib, lzma, zstd; domyślnie zlib)")
+    encrypt.add_argument("--legacy", action="store_true", help="stary format IV + AES-CFB z plikiem .hmac")
+    encrypt.add_argument("--delete-original", action="store_true", help="usuń oryginalne pliki")
+    encrypt.add_argument("--recipient", action="append", default=[],
+                         help="klucz publiczny RSA odbiorcy (PEM); opcję można powtarzać")
+    encrypt.set_defaults(handler=command_encrypt)
+
+    decrypt = subparsers.add_parser("decrypt", help="odszyfrowanie pliku albo strumienia (-)")
+    decrypt.add_argument("path", help="plik .enc; - oznacza stdin -> stdout")
+    decrypt.add_argument("--key", help="plik .key, klucz główny albo klucz prywatny RSA (PEM) "
+                                       "(domyślnie plik .key obok pliku .enc)")
+    decrypt.add_argument("-o", "--output", help="plik wynikowy (domyślnie nazwa pliku bez końcowego .enc; "
+                                                "wymagany dla plików bez tego rozszerzenia)")
+    decrypt.add_argument("--delete-keys", action="store_true", help="usuń pliki klucza i HMAC")
+    decrypt.add_argument("--delete-encrypted", action="store_true", help="usuń zaszyfrowany plik")
+    decrypt.set_defaults(handler=command_decrypt)
+
+    verify = subparsers.add_parser("verify", help="weryfikacja integralności bez odszyfrowywania na dysk")
+    verify.add_argument("paths", nargs="+", help="pliki .enc/.cnar albo katalogi")
+    verify.add_argument("--key", help="klucz używany, gdy obok pliku nie ma pliku .key (np. klucz główny)")
+    verify.add_argument("--report", help="zapis raportu w formacie JSON Lines")
+    verify.set_defaults(handler=command_verify)
+
+    keygen = subparsers.add_parser("keygen", help="utworzenie pary kluczy RSA odbiorcy albo klucza głównego")
+    keygen.add_argument("private_key", nargs="?", help="plik klucza prywatnego (PEM)")
+    keygen.add_argument("public_key", nargs="?", help="plik klucza publicznego (PEM)")
+    keygen.add_argument("--master", metavar="PATH", help="utwórz klucz główny (jeden plik .enc bez pliku .key)")
+    keygen.add_argument("--bits", type=int, default=core.RSA_KEY_SIZE, help="długość klucza RSA")
+    keygen.add_argument("--password", action="store_true", help="zaszyfruj klucz prywatny hasłem")
+    keygen.set_defaults(handler=command_keygen)
+
+    migrate = subparsers.add_parser("migrate-passwords", help="aktualizacja skrótów haseł z pliku importu kont")
+    migrate.add_argument("feed", help="plik JSON Lines z rekordami {\"username\": ..., \"password\": ...}")
+    migrate.add_argument("--db", default=core.USERS_DB, help="baza kont SQLite")
+    migrate.add_argument("--checkpoint", help="plik punktu kontrolnego (wznawianie przerwanej migracji)")
+    migrate.add_argument("--batch-size", type=int, default=core.PASSWORD_MIGRATION_BATCH, help="rozmiar partii")
+    migrate.add_argument("--workers", type=int, default=core.DEFAULT_AUTH_WORKERS, help="liczba wątków")
+    migrate.set_defaults(handler=command_migrate_passwords)
+
+    anonymize = subparsers.add_parser("anonymize", help="wsadowa anonimizacja obrazów i PDF (OCR + NER)")
+    anonymize.add_argument("paths", nargs="+", help="obrazy, pliki PDF albo katalogi")
+    anonymize.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="liczba procesów OCR")
+    anonymize.add_argument("--batch-size", type=int, default=32, help="liczba tekstów w partii nlp.pipe")
+    anonymize.add_argument("--report", help="zapis czasów i wyników w formacie JSON Lines")
+    anonymize.add_argument("--redact", action="store_true",
+                           help="zapisz obrazy wszystkich stron PDF z zamazanymi encjami (także stron z warstwą tekstową)")
+    anonymize.set_defaults(handler=command_anonymize)
+
+    bench = subparsers.add_parser("bench", help="pomiary wydajności szyfrowania")
+    bench.add_argument("path", help="plik testowy")
+    bench.add_argument("--pdf", help="dokument PDF do pomiaru zamazywania stron (współrzędne znaków vs OCR)")
+    bench.add_argument("--ner-model", help="model spaCy do pomiaru opóźnienia NER (tekst z pliku testowego)")
+    bench.add_argument("--rsa", action="store_true", help="pomiar kluczy odbiorców RSA (generuje klucz i 1000 plików)")
+    bench.add_argument("--users", action="store_true", help="pomiar wyszukiwania w bazie użytkowników (20000 kont)")
+    bench.add_argument("--auth", action="store_true", help="pomiar równoległego logowania (haszowanie haseł)")
+    bench.set_defaults(handler=command_bench)
+
+    for subparser in (encrypt, decrypt, verify):
+        subparser.add_argument("--password", action="store_true", help="zapytaj o hasło (klucz pliku chroniony hasłem)")
+        subparser.add_argument("--workers", type=int, default=core.DEFAULT_BATCH_WORKERS, help="liczba wątków")
+    bench.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8], help="liczby wątków do porównania")
+    for subparser in (encrypt, decrypt, bench):
+        subparser.add_argument("--chunk-size", type=int, default=core.CHUNK_SIZE, help="rozmiar segmentu w bajtach")
+    for subparser in (encrypt, decrypt):
+        subparser.add_argument("--io-mode", choices=core.IO_MODES, default="stream", help="tryb wejścia/wyjścia")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(filename=args.log, level=logging.INFO, format='%(asctime)s - %(message)s')
+    try:
+        return args.handler(args)
+    except Exception as e:
+        print(f"Błąd: {e or type(e).__name__}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
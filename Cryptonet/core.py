@@ -0,0 +1,2305 @@
+# -*- coding: utf-8 -*-
+# Rdzeń Cryptonet: szyfrowanie plików, klucze, archiwa, weryfikacja i konta użytkowników.
+# Moduł nie importuje PyQt6 ani bibliotek OCR, więc można go używać na serwerach bez interfejsu graficznego.
+
+import os
+import hashlib
+import io
+import secrets
+import sqlite3
+import datetime
+import functools
+import logging
+import lzma
+import math
+import mmap
+import json
+import struct
+import threading
+import time
+import zlib
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import hashes, hmac, serialization
+from cryptography.hazmat.primitives.asymmetric import padding, rsa
+from cryptography.hazmat.primitives.keywrap import InvalidUnwrap, aes_key_unwrap, aes_key_wrap
+from cryptography.exceptions import InvalidSignature, InvalidTag
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+try:
+    import zstandard  # opcjonalnie: kompresja zstd
+except ImportError:
+    zstandard = None
+try:
+    from cryptography.hazmat.primitives.kdf.argon2 import Argon2id  # cryptography >= 44
+except ImportError:
+    Argon2id = None
+
+# Domyślny rozmiar porcji danych przetwarzanych strumieniowo (1 MiB)
+CHUNK_SIZE = 1024 * 1024
+MIN_CHUNK_SIZE = 4096
+MAX_CHUNK_SIZE = 64 * 1024 * 1024
+
+# Formaty plików .enc
+FORMAT_LEGACY = 1     # IV + AES-CFB, HMAC całego szyfrogramu w osobnym pliku .hmac
+FORMAT_SEGMENTED = 2  # kontener z niezależnie uwierzytelnianymi segmentami AES-GCM
+FORMAT_ARCHIVE = 3    # archiwum wielu plików w kontenerze segmentowym (zob. create_archive)
+
+# Nagłówek kontenera: magia, wersja formatu, algorytm, rozmiar segmentu, prefiks nonce, długość rozszerzeń
+CONTAINER_MAGIC = b"CNET"
+CONTAINER_HEADER = struct.Struct(">4sBBI7sH")
+ALGORITHM_AES_256_GCM = 1
+NONCE_PREFIX_SIZE = 7
+TAG_SIZE = 16
+MAX_SEGMENTS = 2 ** 32
+
+# Rozszerzenia nagłówka kontenera zapisywane jako rekordy TLV: typ (1 bajt), długość (2 bajty), wartość
+EXTENSION_RECORD = struct.Struct(">BH")
+EXT_COMPRESSION = 1
+EXT_WRAPPED_KEY = 2  # identyfikator klucza głównego + klucz pliku opakowany AES Key Wrap (RFC 3394)
+EXT_PASSWORD_KEY = 3  # parametry KDF + sól + klucz pliku opakowany kluczem wyprowadzonym z hasła
+EXT_RECIPIENT_KEY = 4  # identyfikator klucza publicznego odbiorcy + klucz pliku zaszyfrowany RSA-OAEP
+
+# Funkcje wyprowadzania klucza z hasła zapisywane w rozszerzeniu EXT_PASSWORD_KEY (parametry w nagłówku)
+KDF_ALGORITHMS = {"pbkdf2": 1, "scrypt": 2, "argon2id": 3}
+KDF_PARAMETER_NAMES = {
+    "pbkdf2": ("iterations",),
+    "scrypt": ("log_n", "r", "p"),
+    "argon2id": ("iterations", "memory_kib", "lanes"),
+}
+KDF_PARAMETERS = {1: struct.Struct(">I"), 2: struct.Struct(">BBB"), 3: struct.Struct(">IIB")}
+KDF_SALT_SIZE = 16
+KDF_ARGON2_MEMORY_KIB = 64 * 1024
+KDF_CALIBRATION_MAX_SCRYPT_LOG_N = 20  # 1 GiB pamięci przy r=8
+MAX_PASSWORD_SLOTS = 1
+# Dopuszczalne zakresy parametrów: minimum bezpieczeństwa i maksimum chroniące przed plikami wymuszającymi ogromny koszt.
+# Maksima leżą blisko tego, co może dobrać calibrate_kdf (nagłówek pochodzi z niezaufanego pliku): pamięć Argon2id
+# nie przekracza KDF_ARGON2_MEMORY_KIB, a jedno wyprowadzenie trwa najwyżej kilka sekund.
+KDF_LIMITS = {
+    "pbkdf2": {"iterations": (120000, 2000000)},
+    "scrypt": {"log_n": (15, KDF_CALIBRATION_MAX_SCRYPT_LOG_N), "r": (1, 8), "p": (1, 2)},
+    "argon2id": {"iterations": (2, 16), "memory_kib": (19456, KDF_ARGON2_MEMORY_KIB), "lanes": (1, 8)},
+}
+DEFAULT_KDF_TARGET_MS = 250
+DEFAULT_KDF = "argon2id" if Argon2id is not None else "scrypt"
+KDF_CALIBRATION_CACHE = {}
+KDF_CALIBRATION_LOCK = threading.Lock()
+
+# Algorytmy kompresji zapisywane w rozszerzeniu EXT_COMPRESSION
+COMPRESSION_NONE = 0
+COMPRESSION_ALGORITHMS = {"zlib": 1, "lzma": 2, "zstd": 3}
+DEFAULT_COMPRESSION = "zlib"
+
+# Próbka początku pliku oceniana przed kompresją i próg entropii (bity na bajt),
+# powyżej którego dane traktujemy jak już skompresowane lub zaszyfrowane
+COMPRESSION_SAMPLE_SIZE = 64 * 1024
+COMPRESSION_ENTROPY_THRESHOLD = 7.5
+INCOMPRESSIBLE_EXTENSIONS = {
+    ".jpg", ".jpeg", ".png", ".gif", ".webp", ".heic",
+    ".zip", ".gz", ".tgz", ".bz2", ".xz", ".7z", ".rar", ".zst",
+    ".mp3", ".mp4", ".mkv", ".avi", ".mov", ".ogg", ".flac",
+    ".docx", ".xlsx", ".pptx", ".odt", ".enc",
+}
+
+
+# Funkcja sprawdzająca rozmiar porcji danych
+def validate_chunk_size(chunk_size):
+    if not isinstance(chunk_size, int) or not MIN_CHUNK_SIZE <= chunk_size <= MAX_CHUNK_SIZE:
+        raise ValueError(
+            f"Rozmiar porcji musi być liczbą z zakresu {MIN_CHUNK_SIZE}-{MAX_CHUNK_SIZE} bajtów: {chunk_size}"
+        )
+    return chunk_size
+
+# Funkcja czytająca dokładnie size bajtów (mniej tylko na końcu strumienia)
+def read_exact(f, size):
+    data = f.read(size)
+    if not data or len(data) == size:
+        return data
+    parts = [data]
+    remaining = size - len(data)
+    while remaining:
+        part = f.read(remaining)
+        if not part:
+            break
+        parts.append(part)
+        remaining -= len(part)
+    return b"".join(parts)
+
+# Funkcja budowania nagłówka kontenera; cały nagłówek jest danymi AAD każdego segmentu
+def build_container_header(segment_size, nonce_prefix, extensions=b"", version=FORMAT_SEGMENTED):
+    if len(extensions) > 0xFFFF:
+        raise ValueError("Rozszerzenia nagłówka kontenera są za duże (np. zbyt wielu odbiorców).")
+    fixed = CONTAINER_HEADER.pack(
+        CONTAINER_MAGIC, version, ALGORITHM_AES_256_GCM, segment_size, nonce_prefix, len(extensions)
+    )
+    return fixed + extensions
+
+# Funkcja odczytu nagłówka kontenera; zwraca None dla plików w starym formacie
+def read_container_header(f):
+    fixed = read_exact(f, CONTAINER_HEADER.size)
+    if len(fixed) < CONTAINER_HEADER.size or not fixed.startswith(CONTAINER_MAGIC):
+        return None
+
+    _, version, algorithm, segment_size, nonce_prefix, extensions_size = CONTAINER_HEADER.unpack(fixed)
+    if version not in (FORMAT_SEGMENTED, FORMAT_ARCHIVE):
+        raise ValueError(f"Nieobsługiwana wersja formatu pliku: {version}")
+    if algorithm != ALGORITHM_AES_256_GCM:
+        raise ValueError(f"Nieobsługiwany algorytm szyfrowania: {algorithm}")
+    validate_chunk_size(segment_size)
+
+    extensions = read_exact(f, extensions_size)
+    if len(extensions) != extensions_size:
+        raise ValueError("Nagłówek kontenera jest uszkodzony.")
+
+    records = parse_extensions(extensions)
+    compression = records.get(EXT_COMPRESSION, [bytes([COMPRESSION_NONE])])[0]
+    if len(compression) != 1 or compression[0] not in (COMPRESSION_NONE, *COMPRESSION_ALGORITHMS.values()):
+        raise ValueError("Nieobsługiwany algorytm kompresji w nagłówku kontenera.")
+
+    return {
+        "version": version,
+        "algorithm": algorithm,
+        "segment_size": segment_size,
+        "nonce_prefix": nonce_prefix,
+        "extensions": records,
+        "compression": compression[0],
+        "raw": fixed + extensions,
+    }
+
+# Funkcja kodowania rozszerzeń nagłówka; extensions to lista par (typ, wartość)
+def pack_extensions(extensions):
+    return b"".join(EXTENSION_RECORD.pack(record_type, len(value)) + value for record_type, value in extensions)
+
+# Funkcja dekodowania rozszerzeń nagłówka do słownika typ -> lista wartości.
+# Nieznane typy są zachowywane, aby nowsze pliki dało się odczytać starszą wersją programu.
+def parse_extensions(data):
+    records = {}
+    offset = 0
+    while offset < len(data):
+        if offset + EXTENSION_RECORD.size > len(data):
+            raise ValueError("Rozszerzenia nagłówka kontenera są uszkodzone.")
+        record_type, length = EXTENSION_RECORD.unpack_from(data, offset)
+        offset += EXTENSION_RECORD.size
+        value = data[offset:offset + length]
+        if len(value) != length:
+            raise ValueError("Rozszerzenia nagłówka kontenera są uszkodzone.")
+        records.setdefault(record_type, []).append(value)
+        offset += length
+    return records
+
+# Nonce segmentu: prefiks pliku + numer segmentu + flaga ostatniego segmentu (konstrukcja STREAM).
+# Numer chroni przed zamianą kolejności segmentów, flaga przed obcięciem pliku.
+def segment_nonce(nonce_prefix, index, last):
+    if index >= MAX_SEGMENTS:
+        raise ValueError("Przekroczono maksymalną liczbę segmentów w pliku.")
+    return nonce_prefix + index.to_bytes(4, "big") + (b"\x01" if last else b"\x00")
+
+# Funkcja szyfrowania pojedynczego segmentu (szyfrogram + tag GCM)
+def encrypt_segment(key, nonce_prefix, index, last, aad, plaintext):
+    cipher = Cipher(algorithms.AES(key), modes.GCM(segment_nonce(nonce_prefix, index, last)), backend=default_backend())
+    encryptor = cipher.encryptor()
+    encryptor.authenticate_additional_data(aad)
+    ciphertext = encryptor.update(plaintext) + encryptor.finalize()
+    return ciphertext + encryptor.tag
+
+# Funkcja odszyfrowania i weryfikacji pojedynczego segmentu; zgłasza InvalidTag przy niezgodności
+def decrypt_segment(key, nonce_prefix, index, last, aad, segment):
+    if len(segment) < TAG_SIZE:
+        raise InvalidTag("Segment jest zbyt krótki.")
+    nonce = segment_nonce(nonce_prefix, index, last)
+    cipher = Cipher(algorithms.AES(key), modes.GCM(nonce, segment[-TAG_SIZE:]), backend=default_backend())
+    decryptor = cipher.decryptor()
+    decryptor.authenticate_additional_data(aad)
+    return decryptor.update(segment[:-TAG_SIZE]) + decryptor.finalize()
+
+# Funkcja szyfrowania segmentu bezpośrednio do bufora wyjściowego (szyfrogram, a za nim tag GCM)
+def encrypt_segment_into(key, nonce_prefix, index, last, aad, plaintext, out):
+    cipher = Cipher(algorithms.AES(key), modes.GCM(segment_nonce(nonce_prefix, index, last)), backend=default_backend())
+    encryptor = cipher.encryptor()
+    encryptor.authenticate_additional_data(aad)
+    size = encryptor.update_into(plaintext, out)
+    encryptor.finalize()
+    out[size:size + TAG_SIZE] = encryptor.tag
+    return size + TAG_SIZE
+
+# Funkcja odszyfrowania segmentu bezpośrednio do bufora wyjściowego; bufor musi mieć zapas TAG_SIZE bajtów
+def decrypt_segment_into(key, nonce_prefix, index, last, aad, segment, out):
+    if len(segment) < TAG_SIZE:
+        raise InvalidTag("Segment jest zbyt krótki.")
+    nonce = segment_nonce(nonce_prefix, index, last)
+    cipher = Cipher(algorithms.AES(key), modes.GCM(nonce, bytes(segment[-TAG_SIZE:])), backend=default_backend())
+    decryptor = cipher.decryptor()
+    decryptor.authenticate_additional_data(aad)
+    with memoryview(segment)[:-TAG_SIZE] as ciphertext:
+        size = decryptor.update_into(ciphertext, out)
+    decryptor.finalize()
+    return size
+
+# Pula wielokrotnie używanych buforów bytearray. Jedna pula może obsługiwać wiele plików
+# (np. całą partię w encrypt_many), dzięki czemu pętla szyfrowania nie alokuje nowych buforów na porcję.
+class BufferPool:
+    def __init__(self, max_idle=64):
+        self.max_idle = max_idle
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, size):
+        with self._lock:
+            idle = self._idle.get(size)
+            if idle:
+                return idle.pop()
+        return bytearray(size)
+
+    def release(self, buffer):
+        with self._lock:
+            idle = self._idle.setdefault(len(buffer), [])
+            if len(idle) < self.max_idle:
+                idle.append(buffer)
+
+# Funkcja wczytująca dane do bufora aż do jego zapełnienia (mniej tylko na końcu strumienia)
+def readinto_exact(f, buffer):
+    view = memoryview(buffer)
+    total = 0
+    while total < len(view):
+        size = f.readinto(view[total:])
+        if not size:
+            break
+        total += size
+    return total
+
+# Generator dzielący strumień na segmenty w buforach z puli: (numer, czy ostatni, bufor, rozmiar).
+# Bufor przechodzi na własność odbiorcy, który zwraca go do puli po użyciu.
+def iter_segment_buffers(src, segment_size, buffers):
+    index = 0
+    buffer = buffers.acquire(segment_size)
+    size = readinto_exact(src, buffer)
+    while True:
+        # Odczyt z wyprzedzeniem pozwala oznaczyć ostatni segment bez znajomości rozmiaru strumienia
+        next_buffer, next_size = None, 0
+        if size == segment_size:
+            next_buffer = buffers.acquire(segment_size)
+            next_size = readinto_exact(src, next_buffer)
+        last = next_size == 0
+        if last and next_buffer is not None:
+            buffers.release(next_buffer)
+        yield index, last, buffer, size
+        if last:
+            return
+        buffer, size = next_buffer, next_size
+        index += 1
+
+# Funkcja wyznaczająca liczbę segmentów i rozmiar tekstu jawnego na podstawie rozmiaru danych kontenera
+def segment_layout(data_size, segment_size):
+    block_size = segment_size + TAG_SIZE
+    segment_count = max(1, -(-data_size // block_size))
+    last_block_size = data_size - (segment_count - 1) * block_size
+    if last_block_size < TAG_SIZE:
+        raise ValueError("Plik zaszyfrowany jest obcięty lub uszkodzony.")
+    return segment_count, (segment_count - 1) * segment_size + last_block_size - TAG_SIZE
+
+# Funkcja szyfrowania strumienia segmentami; zwraca liczbę bajtów tekstu jawnego
+def encrypt_segments(src, dst, key, nonce_prefix, aad, segment_size, buffers=None):
+    buffers = buffers or BufferPool()
+    out = buffers.acquire(segment_size + TAG_SIZE)
+    out_view = memoryview(out)
+    plaintext_size = 0
+    try:
+        for index, last, buffer, size in iter_segment_buffers(src, segment_size, buffers):
+            chunk = memoryview(buffer)[:size]
+            written = encrypt_segment_into(key, nonce_prefix, index, last, aad, chunk, out_view)
+            dst.write(out_view[:written])
+            chunk.release()
+            buffers.release(buffer)
+            plaintext_size += size
+    finally:
+        out_view.release()
+        buffers.release(out)
+    return plaintext_size
+
+# Funkcja odszyfrowania strumienia segmentami; do dst trafia wyłącznie zweryfikowany tekst jawny
+def decrypt_segments(src, dst, key, nonce_prefix, aad, segment_size, buffers=None):
+    buffers = buffers or BufferPool()
+    block_size = segment_size + TAG_SIZE
+    block, next_block, out = (buffers.acquire(block_size) for _ in range(3))
+    out_view = memoryview(out)
+    plaintext_size = 0
+    index = 0
+    try:
+        size = readinto_exact(src, block)
+        while True:
+            next_size = readinto_exact(src, next_block) if size == block_size else 0
+            last = next_size == 0
+            with memoryview(block) as block_view:
+                written = decrypt_segment_into(
+                    key, nonce_prefix, index, last, aad, block_view[:size], out_view
+                )
+            dst.write(out_view[:written])
+            plaintext_size += written
+            if last:
+                return plaintext_size
+            block, next_block = next_block, block
+            size = next_size
+            index += 1
+    finally:
+        out_view.release()
+        for buffer in (block, next_block, out):
+            buffers.release(buffer)
+
+# Blokada dla systemów bez os.pread/os.pwrite (Windows), gdzie seek i odczyt/zapis muszą być niepodzielne
+positional_io_lock = threading.Lock()
+
+# Funkcja odczytu bloku spod wskazanego przesunięcia bez zmiany wspólnej pozycji pliku
+def read_at(fd, size, offset):
+    if hasattr(os, "pread"):
+        parts = []
+        while size:
+            part = os.pread(fd, size, offset)
+            if not part:
+                break
+            parts.append(part)
+            size -= len(part)
+            offset += len(part)
+        return b"".join(parts)
+    with positional_io_lock:
+        os.lseek(fd, offset, os.SEEK_SET)
+        parts = []
+        while size:
+            part = os.read(fd, size)
+            if not part:
+                break
+            parts.append(part)
+            size -= len(part)
+        return b"".join(parts)
+
+# Funkcja odczytu spod wskazanego przesunięcia bezpośrednio do bufora (preadv, gdy dostępne)
+def read_into_at(fd, buffer, offset):
+    view = memoryview(buffer)
+    if not hasattr(os, "preadv"):
+        data = read_at(fd, len(view), offset)
+        view[:len(data)] = data
+        return len(data)
+    total = 0
+    while total < len(view):
+        size = os.preadv(fd, [view[total:]], offset + total)
+        if not size:
+            break
+        total += size
+    return total
+
+# Funkcja zapisu bloku pod wskazanym przesunięciem (pwrite), bezpieczna dla wielu wątków
+def write_at(fd, data, offset):
+    view = memoryview(data)
+    if hasattr(os, "pwrite"):
+        while view:
+            written = os.pwrite(fd, view, offset)
+            view = view[written:]
+            offset += written
+        return
+    with positional_io_lock:
+        os.lseek(fd, offset, os.SEEK_SET)
+        while view:
+            view = view[os.write(fd, view):]
+
+# Funkcja wykonująca zadania w puli wątków przy ograniczonej liczbie zadań w toku (stałe zużycie pamięci).
+# Pierwszy błąd zadania przerywa przetwarzanie i jest zgłaszany dalej.
+def run_bounded(executor, tasks, max_pending):
+    pending = set()
+    try:
+        for task in tasks:
+            pending.add(executor.submit(*task))
+            if len(pending) >= max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    future.result()
+        done, pending = wait(pending)
+        for future in done:
+            future.result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+# Funkcja wykonująca zadania w bieżącym wątku (workers=1) albo w ograniczonej puli wątków
+def run_tasks(tasks, workers):
+    if workers <= 1:
+        for function, *args in tasks:
+            function(*args)
+        return
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        run_bounded(executor, tasks, workers * 2)
+
+# Funkcja równoległego szyfrowania strumienia segmentami w puli wątków.
+# Odczyt pozostaje sekwencyjny, szyfrowanie segmentów i zapis pwrite idą równolegle.
+def encrypt_segments_parallel(src, dst_fd, key, nonce_prefix, aad, segment_size, data_offset, workers,
+                              buffers=None):
+    buffers = buffers or BufferPool()
+    block_size = segment_size + TAG_SIZE
+    totals = {"plaintext_size": 0}
+
+    def encrypt_task(index, last, buffer, size):
+        out = buffers.acquire(block_size)
+        try:
+            with memoryview(buffer) as chunk, memoryview(out) as out_view:
+                written = encrypt_segment_into(key, nonce_prefix, index, last, aad, chunk[:size], out_view)
+                write_at(dst_fd, out_view[:written], data_offset + index * block_size)
+        finally:
+            buffers.release(out)
+            buffers.release(buffer)
+
+    def tasks():
+        for index, last, buffer, size in iter_segment_buffers(src, segment_size, buffers):
+            totals["plaintext_size"] += size
+            yield encrypt_task, index, last, buffer, size
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        run_bounded(executor, tasks(), workers * 2)
+    return totals["plaintext_size"]
+
+# Funkcja równoległego odszyfrowania kontenera; każdy wątek czyta (pread), weryfikuje i zapisuje (pwrite) swój segment
+def decrypt_segments_parallel(src_fd, dst_fd, key, header, data_size, workers, buffers=None):
+    buffers = buffers or BufferPool()
+    segment_size = header["segment_size"]
+    block_size = segment_size + TAG_SIZE
+    data_offset = len(header["raw"])
+    segment_count, plaintext_size = segment_layout(data_size, segment_size)
+
+    def decrypt_task(index):
+        block = buffers.acquire(block_size)
+        out = buffers.acquire(block_size)
+        try:
+            with memoryview(block) as block_view, memoryview(out) as out_view:
+                size = read_into_at(src_fd, block_view, data_offset + index * block_size)
+                last = index == segment_count - 1
+                written = decrypt_segment_into(
+                    key, header["nonce_prefix"], index, last, header["raw"], block_view[:size], out_view
+                )
+                write_at(dst_fd, out_view[:written], index * segment_size)
+        finally:
+            buffers.release(out)
+            buffers.release(block)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        run_bounded(executor, ((decrypt_task, index) for index in range(segment_count)), workers * 2)
+    return plaintext_size
+
+# Funkcja szyfrowania pliku przez mapowanie pamięci (mmap). Szyfr działa bezpośrednio na fragmentach
+# (memoryview) mapowania wejścia i zapisuje do mapowania wstępnie powiększonego pliku wyjściowego,
+# bez pośrednich obiektów bytes; stronicowaniem zarządza jądro systemu.
+def encrypt_file_mmap(src, dst, key, nonce_prefix, header, segment_size, workers=1):
+    plaintext_size = os.fstat(src.fileno()).st_size
+    if plaintext_size == 0:
+        raise ValueError("Nie można zmapować pustego pliku.")
+    segment_count = -(-plaintext_size // segment_size)
+    data_offset = len(header)
+    block_size = segment_size + TAG_SIZE
+
+    dst.write(header)
+    dst.flush()
+    os.ftruncate(dst.fileno(), data_offset + plaintext_size + segment_count * TAG_SIZE)
+
+    with mmap.mmap(src.fileno(), 0, access=mmap.ACCESS_READ) as in_map, \
+            mmap.mmap(dst.fileno(), 0, access=mmap.ACCESS_WRITE) as out_map, \
+            memoryview(in_map) as in_view, memoryview(out_map) as out_view:
+
+        def encrypt_task(index):
+            start = index * segment_size
+            end = min(start + segment_size, plaintext_size)
+            out_start = data_offset + index * block_size
+            # Wycinki są zwalniane od razu, także przy wyjątku - inaczej zamknięcie mapowania zgłosiłoby BufferError
+            with in_view[start:end] as plaintext, out_view[out_start:out_start + end - start + TAG_SIZE] as out:
+                encrypt_segment_into(key, nonce_prefix, index, index == segment_count - 1, header, plaintext, out)
+
+        run_tasks(((encrypt_task, index) for index in range(segment_count)), workers)
+        out_map.flush()
+    return plaintext_size
+
+# Funkcja odszyfrowania kontenera przez mapowanie pamięci (mmap) do pliku wyjściowego
+def decrypt_file_mmap(src, dst, key, header, workers=1):
+    segment_size = header["segment_size"]
+    block_size = segment_size + TAG_SIZE
+    data_offset = len(header["raw"])
+    file_size = os.fstat(src.fileno()).st_size
+    segment_count, plaintext_size = segment_layout(file_size - data_offset, segment_size)
+
+    # Zapas TAG_SIZE bajtów na końcu: update_into starszych wersji cryptography wymaga bufora dłuższego niż dane
+    os.ftruncate(dst.fileno(), plaintext_size + TAG_SIZE)
+
+    with mmap.mmap(src.fileno(), 0, access=mmap.ACCESS_READ) as in_map, \
+            mmap.mmap(dst.fileno(), 0, access=mmap.ACCESS_WRITE) as out_map, \
+            memoryview(in_map) as in_view, memoryview(out_map) as out_view:
+
+        def decrypt_task(index):
+            block_start = data_offset + index * block_size
+            block_end = min(block_start + block_size, file_size)
+            out_start = index * segment_size
+            # Wycinki są zwalniane od razu, także przy InvalidTag - inaczej zamknięcie mapowania zgłosiłoby
+            # BufferError zamiast błędu weryfikacji
+            with in_view[block_start:block_end] as segment, \
+                    out_view[out_start:out_start + block_end - block_start] as out:
+                decrypt_segment_into(
+                    key, header["nonce_prefix"], index, index == segment_count - 1, header["raw"], segment, out
+                )
+
+        run_tasks(((decrypt_task, index) for index in range(segment_count)), workers)
+        out_map.flush()
+
+    os.ftruncate(dst.fileno(), plaintext_size)
+    return plaintext_size
+
+# Funkcja szyfrowania strumienia w starym formacie (IV + AES-CFB) z HMAC liczonym na bieżąco
+def encrypt_legacy_stream(src, dst, key, chunk_size, file_id_hash=None, buffers=None):
+    buffers = buffers or BufferPool()
+    iv = secrets.token_bytes(16)   # 128-bitowy IV
+    logging.info(f"Wygenerowano IV: {iv.hex()}")
+
+    cipher = Cipher(algorithms.AES(key), modes.CFB(iv), backend=default_backend())
+    encryptor = cipher.encryptor()
+
+    # HMAC dla weryfikacji integralności liczony na bieżąco z kolejnych porcji szyfrogramu
+    hmac_key = secrets.token_bytes(32)  # Klucz HMAC
+    hmac_generator = hmac.HMAC(hmac_key, hashes.SHA256(), backend=default_backend())
+
+    plaintext_size = 0
+    dst.write(iv)
+    buffer = buffers.acquire(chunk_size)
+    out = buffers.acquire(chunk_size + TAG_SIZE)
+    try:
+        with memoryview(buffer) as view, memoryview(out) as out_view:
+            while size := src.readinto(view):
+                plaintext_size += size
+                if file_id_hash is not None:
+                    file_id_hash.update(view[:size])
+                written = encryptor.update_into(view[:size], out_view)
+                hmac_generator.update(out_view[:written])
+                dst.write(out_view[:written])
+    finally:
+        buffers.release(out)
+        buffers.release(buffer)
+    ciphertext = encryptor.finalize()
+    hmac_generator.update(ciphertext)
+    dst.write(ciphertext)
+    return plaintext_size, hmac_key, hmac_generator.finalize()
+
+# Funkcja odszyfrowania strumienia w starym formacie; zwraca True, jeśli HMAC się zgadza
+def decrypt_legacy_stream(src, dst, key, hmac_key, hmac_digest, chunk_size, buffers=None):
+    buffers = buffers or BufferPool()
+    hmac_verifier = hmac.HMAC(hmac_key, hashes.SHA256(), backend=default_backend())
+
+    # IV (pierwsze 16 bajtów)
+    iv = src.read(16)
+    logging.info(f"Odczytano IV: {iv.hex()}")
+    cipher = Cipher(algorithms.AES(key), modes.CFB(iv), backend=default_backend())
+    decryptor = cipher.decryptor()
+    buffer = buffers.acquire(chunk_size)
+    out = buffers.acquire(chunk_size + TAG_SIZE)
+    try:
+        with memoryview(buffer) as view, memoryview(out) as out_view:
+            while size := src.readinto(view):
+                hmac_verifier.update(view[:size])
+                written = decryptor.update_into(view[:size], out_view)
+                dst.write(out_view[:written])
+    finally:
+        buffers.release(out)
+        buffers.release(buffer)
+    dst.write(decryptor.finalize())
+
+    try:
+        hmac_verifier.verify(hmac_digest)
+        return True
+    except InvalidSignature:
+        return False
+
+# Funkcja wybierająca algorytm kompresji dla opcji compress (True oznacza algorytm domyślny)
+def resolve_compression(compress):
+    if not compress:
+        return None
+    name = DEFAULT_COMPRESSION if compress is True else compress
+    if name not in COMPRESSION_ALGORITHMS:
+        raise ValueError(f"Nieobsługiwany algorytm kompresji: {name}")
+    if name == "zstd" and zstandard is None:
+        logging.warning("Biblioteka zstandard nie jest zainstalowana - użyto kompresji zlib.")
+        name = "zlib"
+    return name
+
+# Funkcja obliczająca entropię Shannona próbki danych (bity na bajt)
+def sample_entropy(sample):
+    if not sample:
+        return 0.0
+    entropy = 0.0
+    for value in range(256):
+        count = sample.count(value)
+        if count:
+            probability = count / len(sample)
+            entropy -= probability * math.log2(probability)
+    return entropy
+
+# Funkcja oceniająca, czy plik warto kompresować: rozszerzenie i entropia próbki z początku pliku.
+# Pozycja w strumieniu src jest przywracana; strumienie bez seek (potoki) są podglądane metodą peek.
+def is_compressible(file_path, src):
+    if file_path and os.path.splitext(file_path)[1].lower() in INCOMPRESSIBLE_EXTENSIONS:
+        return False
+    if src.seekable():
+        start = src.tell()
+        sample = src.read(COMPRESSION_SAMPLE_SIZE)
+        src.seek(start)
+    elif hasattr(src, "peek"):
+        sample = src.peek(COMPRESSION_SAMPLE_SIZE)[:COMPRESSION_SAMPLE_SIZE]
+    else:
+        return True
+    return sample_entropy(sample) < COMPRESSION_ENTROPY_THRESHOLD
+
+# Funkcja tworząca strumieniowy kompresor (metody compress i flush)
+def create_compressor(name):
+    if name == "zlib":
+        return zlib.compressobj(6)
+    if name == "lzma":
+        return lzma.LZMACompressor()
+    return zstandard.ZstdCompressor().compressobj()
+
+# Źródło danych dla szyfrowania segmentami zwracające skompresowaną postać strumienia src.
+class CompressingReader:
+    def __init__(self, src, name, chunk_size):
+        self._src = src
+        self._compressor = create_compressor(name)
+        self._chunk_size = chunk_size
+        self._pending = b""
+        self._offset = 0
+        self._finished = False
+        self.plaintext_size = 0
+        self.compressed_size = 0
+
+    def readinto(self, buffer):
+        while self._offset >= len(self._pending):
+            if self._finished:
+                return 0
+            chunk = self._src.read(self._chunk_size)
+            if chunk:
+                self.plaintext_size += len(chunk)
+                self._pending = self._compressor.compress(chunk)
+            else:
+                self._pending = self._compressor.flush()
+                self._finished = True
+            self._offset = 0
+
+        size = min(len(buffer), len(self._pending) - self._offset)
+        with memoryview(self._pending) as pending:
+            buffer[:size] = pending[self._offset:self._offset + size]
+        self._offset += size
+        self.compressed_size += size
+        return size
+
+# Pomocniczy cel zapisu dla dekompresora zstd, który sam oddaje rozpakowane dane porcjami
+class DecompressedSink:
+    def __init__(self, writer):
+        self._writer = writer
+
+    def write(self, data):
+        self._writer._emit(data)
+        return len(data)
+
+# Cel zapisu dla odszyfrowania segmentami, który rozpakowuje dane przed przekazaniem ich do dst.
+# Wynik jest oddawany porcjami po chunk_size bajtów, więc silnie skompresowane dane nie zajmują całej pamięci.
+class DecompressingWriter:
+    def __init__(self, dst, compression, chunk_size):
+        self._dst = dst
+        self._compression = compression
+        self._chunk_size = chunk_size
+        self._zstd_writer = None
+        self.size = 0
+        if compression == COMPRESSION_ALGORITHMS["zlib"]:
+            self._decompressor = zlib.decompressobj()
+        elif compression == COMPRESSION_ALGORITHMS["lzma"]:
+            self._decompressor = lzma.LZMADecompressor()
+        elif compression == COMPRESSION_ALGORITHMS["zstd"]:
+            if zstandard is None:
+                raise ValueError("Plik skompresowano algorytmem zstd, a biblioteka zstandard nie jest zainstalowana.")
+            self._zstd_writer = zstandard.ZstdDecompressor().stream_writer(
+                DecompressedSink(self), write_size=chunk_size, closefd=False
+            )
+        else:
+            raise ValueError(f"Nieobsługiwany algorytm kompresji: {compression}")
+
+    # Zapis rozpakowanej porcji do pliku docelowego
+    def _emit(self, data):
+        if data:
+            self._dst.write(data)
+            self.size += len(data)
+
+    def write(self, data):
+        if self._zstd_writer is not None:
+            self._zstd_writer.write(data)
+        elif self._compression == COMPRESSION_ALGORITHMS["zlib"]:
+            self._emit(self._decompressor.decompress(data, self._chunk_size))
+            while self._decompressor.unconsumed_tail:
+                self._emit(self._decompressor.decompress(self._decompressor.unconsumed_tail, self._chunk_size))
+        else:
+            self._emit(self._decompressor.decompress(data, self._chunk_size))
+            while not self._decompressor.eof and not self._decompressor.needs_input:
+                self._emit(self._decompressor.decompress(b"", self._chunk_size))
+        return len(data)
+
+    # Zakończenie dekompresji; niekompletny strumień skompresowany jest błędem
+    def finish(self):
+        if self._zstd_writer is not None:
+            self._zstd_writer.flush()
+            return self.size
+        if self._compression == COMPRESSION_ALGORITHMS["zlib"]:
+            self._emit(self._decompressor.flush())
+        if not self._decompressor.eof:
+            raise ValueError("Skompresowane dane są niekompletne.")
+        return self.size
+
+# Tryby wejścia/wyjścia: strumieniowy (read/write) albo mapowanie pamięci (tylko format segmentowy)
+IO_MODES = ("stream", "mmap")
+
+# Funkcja sprawdzająca tryb wejścia/wyjścia dla danego formatu pliku
+def resolve_io_mode(io_mode, format_version):
+    if io_mode not in IO_MODES:
+        raise ValueError(f"Nieobsługiwany tryb wejścia/wyjścia: {io_mode}")
+    if io_mode == "mmap" and format_version == FORMAT_LEGACY:
+        logging.warning("Stary format nie obsługuje trybu mmap - użyto trybu strumieniowego.")
+        return "stream"
+    return io_mode
+
+# Funkcja generowania identyfikatora pliku (hash)
+def generate_file_id(file_path):
+    hash_func = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while chunk := f.read(4096):
+            hash_func.update(chunk)
+    file_id = hash_func.digest()
+    logging.info(f"Wygenerowano identyfikator pliku: {file_id.hex()}")
+    return file_id
+
+# Identyfikator kontenera segmentowego zapisywany w pliku .key: skrót nagłówka (unikalny dzięki losowemu
+# prefiksowi nonce). Tekst jawny nie jest haszowany, bo identyfikator kontenera nie jest sprawdzany przy odszyfrowaniu.
+def container_file_id(header):
+    return hashlib.sha256(header).digest()
+
+# Funkcja wyznaczająca domyślną ścieżkę odszyfrowanego pliku: usuwa wyłącznie końcowe rozszerzenie .enc.
+# Dla pliku bez tego rozszerzenia zwraca None (wynik zastąpiłby plik zaszyfrowany).
+def decrypted_file_path(file_path):
+    if not file_path.endswith(".enc") or os.path.basename(file_path) == ".enc":
+        return None
+    return file_path[:-len(".enc")]
+
+# Funkcja sprawdzająca, czy dwie ścieżki wskazują ten sam plik
+def is_same_path(first, second):
+    if os.path.exists(first) and os.path.exists(second):
+        return os.path.samefile(first, second)
+    return os.path.normcase(os.path.abspath(first)) == os.path.normcase(os.path.abspath(second))
+
+# Funkcja usuwania pliku
+def delete_file(file_path):
+    try:
+        if os.path.isfile(file_path):
+            os.remove(file_path)
+            logging.info(f"Usunięto plik: {file_path}")
+        else:
+            logging.warning(f"Plik do usunięcia nie istnieje: {file_path}")
+    except Exception as e:
+        logging.error(f"Błąd podczas usuwania pliku {file_path}: {e}")
+
+# Funkcja szyfrowania pliku
+def encrypt_file(file_path, compress=False, password=None, use_rsa=False, delete_original=False,
+                 chunk_size=CHUNK_SIZE, format_version=FORMAT_SEGMENTED, workers=1, io_mode="stream",
+                 key_path=None, recipients=None, buffers=None, raise_errors=False):
+    try:
+        logging.info(f"Rozpoczęto szyfrowanie pliku: {file_path}")
+        validate_chunk_size(chunk_size)
+        if format_version not in (FORMAT_LEGACY, FORMAT_SEGMENTED):
+            raise ValueError(f"Nieobsługiwany format pliku: {format_version}")
+        if workers > 1 and format_version == FORMAT_LEGACY:
+            # Tryb CFB wiąże kolejne bloki szyfrogramu, więc stary format szyfrujemy sekwencyjnie
+            logging.warning("Stary format nie obsługuje szyfrowania równoległego - użyto jednego wątku.")
+            workers = 1
+        io_mode = resolve_io_mode(io_mode, format_version)
+        compression = resolve_compression(compress)
+        if compression and format_version == FORMAT_LEGACY:
+            logging.warning("Stary format nie obsługuje kompresji - plik zostanie zaszyfrowany bez kompresji.")
+            compression = None
+
+        # Z kluczem głównym powstaje jeden plik: klucz pliku jest opakowany w nagłówku kontenera
+        master_key = None
+        if key_path is not None:
+            if format_version == FORMAT_LEGACY:
+                raise ValueError("Stary format wymaga osobnych plików .key i .hmac.")
+            master_key = read_master_key(key_path)
+            if master_key is None:
+                raise ValueError(f"Plik nie jest kluczem głównym: {key_path}")
+        # Z hasłem klucz pliku jest opakowany kluczem wyprowadzonym z hasła (parametry KDF w nagłówku)
+        if password is not None and format_version == FORMAT_LEGACY:
+            raise ValueError("Stary format nie obsługuje szyfrowania hasłem.")
+        # Z kluczami publicznymi odbiorców klucz pliku jest szyfrowany RSA-OAEP osobno dla każdego odbiorcy
+        public_keys = load_recipients(recipients or [])
+        if use_rsa and not public_keys:
+            raise ValueError("Szyfrowanie RSA wymaga podania kluczy publicznych odbiorców.")
+        if public_keys and format_version == FORMAT_LEGACY:
+            raise ValueError("Stary format nie obsługuje szyfrowania dla odbiorców RSA.")
+
+        # Generowanie klucza AES (256-bitowy)
+        key = secrets.token_bytes(32)  # 256-bitowy klucz AES
+        logging.info("Wygenerowano klucz AES (materiał klucza nie jest zapisywany w dzienniku).")
+        extensions = []
+        if master_key is not None:
+            extensions.append((EXT_WRAPPED_KEY, wrap_file_key(master_key, key)))
+        if password is not None:
+            extensions.append((EXT_PASSWORD_KEY, wrap_password_key(password, key)))
+        for key_id, public_key in public_keys:
+            extensions.append((EXT_RECIPIENT_KEY, wrap_recipient_key(key_id, public_key, key)))
+
+        # Identyfikator pliku w starym formacie (SHA-256 tekstu jawnego, sprawdzany przy odszyfrowaniu) liczony
+        # w tym samym przebiegu co szyfrowanie. Kontenery segmentowe go nie sprawdzają, więc tekstu jawnego
+        # nie haszujemy: SHA-256 w wątku czytającym ograniczałby szyfrowanie równoległe do jednego rdzenia.
+        file_id_hash = hashlib.sha256() if format_version == FORMAT_LEGACY else None
+
+        # Bufory porcji danych są pobierane z puli (wspólnej dla partii plików, jeśli ją przekazano)
+        buffers = buffers or BufferPool()
+
+        # Strumieniowe szyfrowanie porcjami - każda porcja jest czytana z dysku tylko raz.
+        # Szyfrogram trafia do pliku tymczasowego; plik .enc pojawia się (albo zastępuje poprzedni) dopiero
+        # po zapisaniu całego szyfrogramu, pliku HMAC i pliku klucza, więc błąd nie zostawia obciętego .enc.
+        encrypted_path = file_path + ".enc"
+        partial_path = encrypted_path + ".part"
+        try:
+            with open(file_path, "rb") as src, open(partial_path, "w+b") as dst:
+                # Dane już skompresowane lub zaszyfrowane (JPEG, ZIP, .enc) szyfrujemy bez kompresji
+                if compression and not is_compressible(file_path, src):
+                    logging.info(f"Pominięto kompresję pliku {file_path}: dane wyglądają na skompresowane.")
+                    compression = None
+                if compression and io_mode == "mmap":
+                    logging.info("Kompresja wymaga trybu strumieniowego - pominięto tryb mmap.")
+                    io_mode = "stream"
+
+                if format_version == FORMAT_LEGACY:
+                    plaintext_size, hmac_key, hmac_digest = encrypt_legacy_stream(
+                        src, dst, key, chunk_size, file_id_hash, buffers
+                    )
+                elif io_mode == "mmap" and os.fstat(src.fileno()).st_size > 0:
+                    nonce_prefix = secrets.token_bytes(NONCE_PREFIX_SIZE)
+                    header = build_container_header(chunk_size, nonce_prefix, pack_extensions(extensions))
+                    plaintext_size = encrypt_file_mmap(src, dst, key, nonce_prefix, header, chunk_size, workers)
+                else:
+                    nonce_prefix = secrets.token_bytes(NONCE_PREFIX_SIZE)
+                    if compression:
+                        # Kompresja przed podziałem na segmenty; algorytm jest zapisany w nagłówku
+                        # (i chroniony jako AAD)
+                        extensions.append((EXT_COMPRESSION, bytes([COMPRESSION_ALGORITHMS[compression]])))
+                        source = CompressingReader(src, compression, chunk_size)
+                    else:
+                        source = src
+                    header = build_container_header(chunk_size, nonce_prefix, pack_extensions(extensions))
+                    dst.write(header)
+                    if workers > 1:
+                        dst.flush()
+                        plaintext_size = encrypt_segments_parallel(
+                            source, dst.fileno(), key, nonce_prefix, header, chunk_size, len(header), workers,
+                            buffers=buffers,
+                        )
+                    else:
+                        plaintext_size = encrypt_segments(
+                            source, dst, key, nonce_prefix, header, chunk_size, buffers=buffers
+                        )
+                    if compression:
+                        plaintext_size = source.plaintext_size
+                        logging.info(
+                            f"Skompresowano dane ({compression}): {source.plaintext_size} -> "
+                            f"{source.compressed_size} bajtów"
+                        )
+            logging.info(
+                f"Zaszyfrowano dane: {plaintext_size} bajtów (porcje po {chunk_size} bajtów, "
+                f"format {format_version}, wątki: {workers}, tryb I/O: {io_mode})"
+            )
+
+            # Zapis HMAC do pliku (tylko stary format; segmenty kontenera mają własne tagi GCM)
+            if format_version == FORMAT_LEGACY:
+                logging.info(f"Wygenerowano HMAC: {hmac_digest.hex()}")
+                with open(encrypted_path + ".hmac", "wb") as f:
+                    f.write(hmac_digest)
+                logging.info(f"Zapisano HMAC do pliku: {encrypted_path}.hmac")
+
+            # Identyfikator pliku: skrót tekstu jawnego (stary format) albo skrót nagłówka kontenera
+            file_id = file_id_hash.digest() if format_version == FORMAT_LEGACY else container_file_id(header)
+            logging.info(f"Wygenerowano identyfikator pliku: {file_id.hex()}")
+
+            # Zapis klucza, identyfikatora pliku i (w starym formacie) klucza HMAC. Kontener jednoplikowy
+            # (klucz główny, hasło, odbiorcy RSA) ma klucz pliku w nagłówku i nie dostaje pliku .key.
+            if master_key is None and password is None and not public_keys:
+                key_path = file_path + ".key"
+                with open(key_path, "wb") as f:
+                    if format_version == FORMAT_LEGACY:
+                        f.write(file_id + key + hmac_key)  # Dodaj hmac_key do pliku .key
+                    else:
+                        f.write(file_id + key)
+                logging.info(f"Zapisano klucz AES do pliku: {key_path}")
+
+            os.replace(partial_path, encrypted_path)
+            logging.info(f"Zapisano zaszyfrowany plik: {encrypted_path}")
+        finally:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+
+        # Usuń oryginalny plik, jeśli użytkownik zaznaczył opcję
+        if delete_original:
+            delete_file(file_path)
+
+        return encrypted_path, key_path
+    except Exception as e:
+        logging.error(f"Błąd podczas szyfrowania pliku {file_path}: {e}")
+        if raise_errors:
+            raise
+        return None, None
+
+# Funkcja odszyfrowywania pliku
+def decrypt_file(file_path, key_path, password=None, use_rsa=False, delete_keys=False, delete_encrypted=False,
+                 chunk_size=CHUNK_SIZE, workers=1, io_mode="stream", buffers=None, output_path=None):
+    try:
+        logging.info(f"Rozpoczęto odszyfrowywanie pliku: {file_path}")
+        validate_chunk_size(chunk_size)
+        if io_mode not in IO_MODES:
+            raise ValueError(f"Nieobsługiwany tryb wejścia/wyjścia: {io_mode}")
+
+        # Sprawdź, czy plik i klucz istnieją
+        if not os.path.isfile(file_path):
+            logging.error(f"Plik do odszyfrowania nie istnieje: {file_path}")
+            return "Plik do odszyfrowania nie istnieje."
+
+        # Plik wynikowy nigdy nie może zastąpić pliku zaszyfrowanego (ani zostać potem usunięty razem z nim)
+        decrypted_path = output_path or decrypted_file_path(file_path)
+        if decrypted_path is None:
+            logging.error(f"Plik nie ma rozszerzenia .enc, a nie podano pliku wynikowego: {file_path}")
+            return "Plik nie ma rozszerzenia .enc - podaj ścieżkę pliku wynikowego."
+        if is_same_path(decrypted_path, file_path):
+            logging.error(f"Plik wynikowy jest plikiem zaszyfrowanym: {decrypted_path}")
+            return "Plik wynikowy nie może zastąpić pliku zaszyfrowanego."
+
+        # Bez pliku klucza klucz pliku jest odpakowywany hasłem
+        if key_path is None and password is None:
+            logging.error("Nie podano pliku klucza ani hasła.")
+            return "Nie podano pliku klucza ani hasła."
+
+        if key_path is not None and not os.path.isfile(key_path):
+            logging.error(f"Plik klucza nie istnieje: {key_path}")
+            return "Plik klucza nie istnieje."
+
+        # Rozpoznanie formatu pliku po nagłówku kontenera; ten sam uchwyt służy potem do odszyfrowania
+        with open(file_path, "rb") as src:
+            header = read_container_header(src)
+
+            if header is not None and header["version"] == FORMAT_ARCHIVE:
+                logging.error(f"Plik jest zaszyfrowanym archiwum: {file_path}")
+                return "Plik jest zaszyfrowanym archiwum - użyj rozpakowania archiwum."
+
+            # Odczyt klucza, identyfikatora i klucza HMAC z pliku .key albo klucza opakowanego w nagłówku
+            file_id, key, hmac_key, key_kind = load_file_key(key_path, header, password)
+            if use_rsa and key_kind != KEY_KIND_PRIVATE:
+                logging.error("Odszyfrowanie RSA wymaga klucza prywatnego w formacie PEM.")
+                return "Odszyfrowanie RSA wymaga klucza prywatnego w formacie PEM."
+            if file_id:
+                logging.info(f"Odczytano identyfikator pliku: {file_id.hex()}")
+            logging.info(f"Odczytano klucz AES (rodzaj klucza: {key_kind}).")
+
+            # Sprawdź długość klucza AES
+            if len(key) != 32:
+                logging.error(f"Niewłaściwa długość klucza AES: {len(key)} bajtów")
+                return "Niewłaściwa długość klucza AES."
+
+            if header is None:
+                logging.info("Odczytano klucz HMAC.")
+
+                # Sprawdź, czy oryginalny plik istnieje
+                original_file_path = decrypted_file_path(file_path)
+                if original_file_path is not None and os.path.isfile(original_file_path):
+                    # Generowanie identyfikatora z oryginalnego pliku
+                    actual_file_id = generate_file_id(original_file_path)
+                    logging.info(f"Wygenerowano aktualny identyfikator pliku: {actual_file_id.hex()}")
+
+                    # Weryfikacja identyfikatora
+                    if file_id != actual_file_id:
+                        logging.error("Klucz nie pasuje do tego pliku!")
+                        return "Klucz nie pasuje do tego pliku!"
+                else:
+                    logging.warning("Oryginalny plik nie istnieje. Pominięto weryfikację identyfikatora.")
+
+                # Sprawdź, czy plik ma wystarczającą długość (co najmniej 16 bajtów IV)
+                encrypted_size = os.path.getsize(file_path)
+                logging.info(f"Rozmiar zaszyfrowanego pliku: {encrypted_size} bajtów")
+                if encrypted_size < 16:
+                    logging.error(f"Plik zaszyfrowany jest zbyt krótki: {encrypted_size} bajtów")
+                    return "Plik zaszyfrowany jest zbyt krótki."
+
+                # Weryfikacja integralności pliku
+                if not os.path.isfile(file_path + ".hmac"):
+                    logging.error(f"Brak pliku HMAC dla pliku: {file_path}")
+                    return "Brak pliku HMAC."
+
+                with open(file_path + ".hmac", "rb") as f:
+                    hmac_digest = f.read()
+                logging.info(f"Odczytano HMAC: {hmac_digest.hex()}")
+            else:
+                logging.info(
+                    f"Rozpoznano kontener w formacie {header['version']} (segmenty po {header['segment_size']} bajtów)"
+                )
+
+            # Odszyfrowywanie strumieniowe do pliku tymczasowego.
+            buffers = buffers or BufferPool()
+            # Plik wynikowy pojawia się dopiero po pozytywnej weryfikacji integralności.
+            partial_path = decrypted_path + ".part"
+            try:
+                with open(partial_path, "w+b") as dst:
+                    if header is None:
+                        src.seek(0)
+                        if not decrypt_legacy_stream(src, dst, key, hmac_key, hmac_digest, chunk_size, buffers):
+                            logging.error("Błąd weryfikacji HMAC.")
+                            return "Błąd weryfikacji HMAC."
+                        logging.info("Weryfikacja HMAC zakończona sukcesem.")
+                    else:
+                        src.seek(len(header["raw"]))
+                        try:
+                            if header["compression"] != COMPRESSION_NONE:
+                                # Strumień skompresowany rozpakowujemy sekwencyjnie, bez trybu mmap i wątków
+                                writer = DecompressingWriter(dst, header["compression"], chunk_size)
+                                decrypt_segments(
+                                    src, writer, key, header["nonce_prefix"], header["raw"], header["segment_size"],
+                                    buffers,
+                                )
+                                plaintext_size = writer.finish()
+                            elif io_mode == "mmap":
+                                plaintext_size = decrypt_file_mmap(src, dst, key, header, workers)
+                            elif workers > 1:
+                                data_size = os.fstat(src.fileno()).st_size - len(header["raw"])
+                                plaintext_size = decrypt_segments_parallel(
+                                    src.fileno(), dst.fileno(), key, header, data_size, workers, buffers
+                                )
+                            else:
+                                plaintext_size = decrypt_segments(
+                                    src, dst, key, header["nonce_prefix"], header["raw"], header["segment_size"],
+                                    buffers,
+                                )
+                        except InvalidTag:
+                            logging.error(
+                                "Błąd weryfikacji segmentu: plik jest uszkodzony, obcięty lub klucz jest niewłaściwy."
+                            )
+                            return "Błąd weryfikacji integralności pliku."
+                        logging.info(f"Odszyfrowano i zweryfikowano dane: {plaintext_size} bajtów")
+
+                # Zapis odszyfrowanego pliku
+                os.replace(partial_path, decrypted_path)
+                logging.info(f"Zapisano odszyfrowany plik: {decrypted_path}")
+            finally:
+                if os.path.exists(partial_path):
+                    os.remove(partial_path)
+
+        # Usuń pliki klucza i HMAC, jeśli użytkownik zaznaczył opcję
+        if delete_keys and key_kind in (KEY_KIND_MASTER, KEY_KIND_PRIVATE):
+            # Klucz główny i klucz prywatny chronią także inne pliki, więc nigdy nie są usuwane automatycznie
+            logging.warning(f"Pominięto usunięcie klucza głównego lub prywatnego: {key_path}")
+        elif delete_keys and key_kind == KEY_KIND_FILE:
+            delete_file(key_path)
+            if header is None:
+                delete_file(file_path + ".hmac")
+            logging.info(f"Usunięto pliki klucza i HMAC.")
+
+        # Usuń zaszyfrowany plik, jeśli użytkownik zaznaczył opcję
+        if delete_encrypted:
+            delete_file(file_path)
+            logging.info(f"Usunięto zaszyfrowany plik: {file_path}")
+
+        return decrypted_path
+    except Exception as e:
+        logging.error(f"Błąd podczas odszyfrowywania pliku {file_path}: {e}")
+        return str(e)
+
+# Domyślna liczba plików szyfrowanych jednocześnie w trybie wsadowym
+DEFAULT_BATCH_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+
+# Funkcja wsadowego szyfrowania wielu plików w ograniczonej puli wątków.
+# Zwraca listę wyników (po jednym słowniku na plik, w kolejności wejściowej).
+def encrypt_many(paths, workers=DEFAULT_BATCH_WORKERS, progress=None, **options):
+    # Wspólna pula buforów: kolejne pliki używają buforów zwolnionych przez poprzednie
+    options.setdefault("buffers", BufferPool(max_idle=3 * max(1, workers)))
+
+    def encrypt_one(path):
+        result = {"path": path, "output": None, "key_path": None, "bytes": 0, "duration": 0.0, "error": None}
+        start = time.perf_counter()
+        try:
+            result["bytes"] = os.path.getsize(path)
+            result["output"], result["key_path"] = encrypt_file(path, raise_errors=True, **options)
+        except Exception as e:
+            result["error"] = str(e) or type(e).__name__
+        result["duration"] = time.perf_counter() - start
+        if progress is not None:
+            progress(result)
+        return result
+
+    paths = list(paths)
+    logging.info(f"Rozpoczęto wsadowe szyfrowanie {len(paths)} plików (wątki: {workers})")
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        results = list(executor.map(encrypt_one, paths))
+    failed = sum(1 for result in results if result["error"])
+    logging.info(f"Zakończono wsadowe szyfrowanie: {len(results) - failed} udanych, {failed} błędów")
+    return results
+
+# Rodzaje kluczy rozpoznawane przez load_file_key
+KEY_KIND_FILE = "file"          # osobny plik .key jednego pliku
+KEY_KIND_MASTER = "master"      # klucz główny (CNKY)
+KEY_KIND_PRIVATE = "private"    # klucz prywatny RSA odbiorcy (PEM)
+KEY_KIND_PASSWORD = "password"  # klucz pliku odpakowany hasłem
+MAX_KEY_FILE_SIZE = 64 * 1024   # klucze PEM mają kilka KB; większy plik na pewno nie jest kluczem
+
+# Funkcja odczytu całego pliku klucza jednym otwarciem (rodzaj klucza rozpoznaje się z zawartości)
+def read_key_data(key_path):
+    with open(key_path, "rb") as f:
+        data = f.read(MAX_KEY_FILE_SIZE + 1)
+    if len(data) > MAX_KEY_FILE_SIZE:
+        raise ValueError(f"Plik klucza jest zbyt duży: {key_path}")
+    return data
+
+# Funkcja dekodowania pliku klucza: identyfikator pliku, klucz AES i (w starym formacie) klucz HMAC
+def parse_key_file(data):
+    file_id = data[:32]       # Pierwsze 32 bajty to identyfikator pliku
+    key = data[32:64]         # Kolejne 32 bajty to klucz AES
+    hmac_key = data[64:96]    # Kolejne 32 bajty to klucz HMAC (tylko stary format)
+    return file_id, key, hmac_key
+
+# Funkcja odczytu pliku klucza: identyfikator pliku, klucz AES i (w starym formacie) klucz HMAC
+def read_key_file(key_path):
+    with open(key_path, "rb") as f:
+        return parse_key_file(f.read(96))
+
+# Plik klucza głównego: magia, wersja i klucz AES-256. Jednym kluczem głównym można zaszyfrować
+# dowolnie wiele plików; każdy plik ma własny klucz AES opakowany kluczem głównym w nagłówku.
+MASTER_KEY_MAGIC = b"CNKY"
+MASTER_KEY_VERSION = 1
+MASTER_KEY_FILE_SIZE = len(MASTER_KEY_MAGIC) + 1 + 32
+KEY_ID_SIZE = 8
+
+# Funkcja tworząca plik klucza głównego (istniejący plik nie jest nadpisywany)
+def create_master_key(key_path):
+    with open(key_path, "xb") as f:
+        f.write(MASTER_KEY_MAGIC + bytes([MASTER_KEY_VERSION]) + secrets.token_bytes(32))
+    logging.info(f"Utworzono klucz główny: {key_path}")
+    return key_path
+
+# Funkcja odczytu klucza głównego; zwraca None, jeśli plik jest zwykłym plikiem .key
+def read_master_key(key_path):
+    with open(key_path, "rb") as f:
+        return parse_master_key(f.read(MASTER_KEY_FILE_SIZE + 1))
+
+# Funkcja dekodowania zawartości pliku klucza głównego; zwraca None dla innych rodzajów kluczy
+def parse_master_key(data):
+    if len(data) != MASTER_KEY_FILE_SIZE or not data.startswith(MASTER_KEY_MAGIC):
+        return None
+    if data[len(MASTER_KEY_MAGIC)] != MASTER_KEY_VERSION:
+        raise ValueError(f"Nieobsługiwana wersja klucza głównego: {data[len(MASTER_KEY_MAGIC)]}")
+    return data[len(MASTER_KEY_MAGIC) + 1:]
+
+# Identyfikator klucza głównego zapisywany w nagłówku (pozwala rozpoznać właściwy klucz bez próby odszyfrowania)
+def master_key_id(master_key):
+    return hashlib.sha256(b"cryptonet-master-key" + master_key).digest()[:KEY_ID_SIZE]
+
+# Funkcja opakowania klucza pliku kluczem głównym (wartość rozszerzenia EXT_WRAPPED_KEY)
+def wrap_file_key(master_key, key):
+    return master_key_id(master_key) + aes_key_wrap(master_key, key)
+
+# Funkcja odpakowania klucza pliku z nagłówka kontenera; zwraca None, jeśli plik zaszyfrowano innym kluczem
+def unwrap_file_key(master_key, header):
+    key_id = master_key_id(master_key)
+    for wrapped in header["extensions"].get(EXT_WRAPPED_KEY, []):
+        if wrapped[:KEY_ID_SIZE] == key_id:
+            try:
+                return aes_key_unwrap(master_key, wrapped[KEY_ID_SIZE:])
+            except InvalidUnwrap:
+                return None
+    return None
+
+# Funkcja wyprowadzająca 256-bitowy klucz z hasła wybraną funkcją KDF
+def derive_password_key(password, salt, params):
+    secret = password.encode("utf-8")
+    if params["kdf"] == "pbkdf2":
+        return hashlib.pbkdf2_hmac("sha256", secret, salt, params["iterations"])
+    if params["kdf"] == "scrypt":
+        n = 2 ** params["log_n"]
+        return hashlib.scrypt(
+            secret, salt=salt, n=n, r=params["r"], p=params["p"], dklen=32,
+            maxmem=256 * n * params["r"] + 1024 * 1024,
+        )
+    return Argon2id(
+        salt=salt, length=32, iterations=params["iterations"], lanes=params["lanes"],
+        memory_cost=params["memory_kib"],
+    ).derive(secret)
+
+# Funkcja sprawdzająca parametry KDF (także odczytane z nagłówka, aby plik nie wymusił nadmiernego kosztu)
+def validate_kdf_params(params):
+    kdf = params.get("kdf")
+    if kdf not in KDF_ALGORITHMS:
+        raise ValueError(f"Nieobsługiwana funkcja wyprowadzania klucza: {kdf}")
+    if kdf == "argon2id" and Argon2id is None:
+        raise ValueError("Argon2id wymaga nowszej wersji biblioteki cryptography.")
+    for name, (low, high) in KDF_LIMITS[kdf].items():
+        if not low <= params.get(name, -1) <= high:
+            raise ValueError(f"Nieprawidłowy parametr {name} funkcji {kdf}: {params.get(name)}")
+    return params
+
+# Funkcja mierząca czas wyprowadzenia klucza (ms) dla podanych parametrów
+def measure_kdf(params):
+    start = time.perf_counter()
+    derive_password_key("calibration", bytes(KDF_SALT_SIZE), params)
+    return (time.perf_counter() - start) * 1000
+
+# Funkcja dobierająca parametry KDF tak, aby wyprowadzenie klucza trwało około target_ms na tym komputerze.
+# Wynik jest zapamiętywany dla procesu; parametry nigdy nie spadają poniżej minimów z KDF_LIMITS.
+def calibrate_kdf(kdf=None, target_ms=DEFAULT_KDF_TARGET_MS):
+    kdf = kdf or DEFAULT_KDF
+    with KDF_CALIBRATION_LOCK:
+        if (kdf, target_ms) in KDF_CALIBRATION_CACHE:
+            return dict(KDF_CALIBRATION_CACHE[(kdf, target_ms)])
+
+        limits = KDF_LIMITS[kdf]
+        if kdf == "pbkdf2":
+            # Koszt PBKDF2 rośnie liniowo z liczbą iteracji
+            probe = {"kdf": kdf, "iterations": limits["iterations"][0]}
+            iterations = int(probe["iterations"] * target_ms / max(measure_kdf(probe), 0.001))
+            params = {"kdf": kdf, "iterations": min(max(iterations, limits["iterations"][0]), limits["iterations"][1])}
+        elif kdf == "scrypt":
+            # Każde zwiększenie log_n podwaja czas i pamięć
+            params = {"kdf": kdf, "log_n": limits["log_n"][0], "r": 8, "p": 1}
+            elapsed = measure_kdf(params)
+            while elapsed * 2 <= target_ms and params["log_n"] < KDF_CALIBRATION_MAX_SCRYPT_LOG_N:
+                params["log_n"] += 1
+                elapsed *= 2
+        else:
+            # Argon2id: stała pamięć, liczba przebiegów dobrana do czasu
+            params = {"kdf": kdf, "iterations": 1, "memory_kib": KDF_ARGON2_MEMORY_KIB, "lanes": 4}
+            iterations = int(target_ms / max(measure_kdf(params), 0.001))
+            params["iterations"] = min(max(iterations, limits["iterations"][0]), limits["iterations"][1])
+
+        logging.info(f"Skalibrowano {kdf} dla {target_ms} ms: {params}")
+        KDF_CALIBRATION_CACHE[(kdf, target_ms)] = params
+        return dict(params)
+
+# Funkcja opakowania klucza pliku kluczem z hasła (wartość rozszerzenia EXT_PASSWORD_KEY):
+# identyfikator KDF, sól, parametry KDF i opakowany klucz
+def wrap_password_key(password, key, params=None):
+    params = validate_kdf_params(params or calibrate_kdf())
+    salt = secrets.token_bytes(KDF_SALT_SIZE)
+    kdf_id = KDF_ALGORITHMS[params["kdf"]]
+    fields = KDF_PARAMETERS[kdf_id].pack(*(params[name] for name in KDF_PARAMETER_NAMES[params["kdf"]]))
+    wrapped = aes_key_wrap(derive_password_key(password, salt, params), key)
+    return bytes([kdf_id]) + salt + fields + wrapped
+
+# Funkcja odpakowania klucza pliku hasłem; zwraca None, jeśli hasło nie pasuje do slotu.
+# encrypt_file zapisuje jeden slot hasła; nagłówek z wieloma slotami jest odrzucany, zanim wyprowadzimy
+# którykolwiek klucz (inaczej spreparowany plik mógłby wymusić setki kosztownych wyprowadzeń).
+def unwrap_password_key(password, header):
+    kdf_names = {kdf_id: name for name, kdf_id in KDF_ALGORITHMS.items()}
+    slots = header["extensions"].get(EXT_PASSWORD_KEY, [])
+    if len(slots) > MAX_PASSWORD_SLOTS:
+        raise ValueError(f"Nagłówek zawiera zbyt wiele slotów hasła: {len(slots)}")
+    for slot in slots:
+        kdf = kdf_names.get(slot[0]) if slot else None
+        if kdf is None:
+            continue
+        parameters = KDF_PARAMETERS[slot[0]]
+        if len(slot) != 1 + KDF_SALT_SIZE + parameters.size + 40:
+            continue
+        salt = slot[1:1 + KDF_SALT_SIZE]
+        fields = parameters.unpack_from(slot, 1 + KDF_SALT_SIZE)
+        params = validate_kdf_params({"kdf": kdf, **dict(zip(KDF_PARAMETER_NAMES[kdf], fields))})
+        try:
+            return aes_key_unwrap(
+                derive_password_key(password, salt, params), slot[1 + KDF_SALT_SIZE + parameters.size:]
+            )
+        except InvalidUnwrap:
+            continue
+    return None
+
+# Klucze RSA odbiorców (PEM). Klucz pliku jest szyfrowany RSA-OAEP (SHA-256) kluczem publicznym każdego
+# odbiorcy, więc jeden szyfrogram można udostępnić wielu osobom bez ponownego szyfrowania danych.
+RSA_KEY_SIZE = 3072
+RSA_OAEP_PADDING = padding.OAEP(mgf=padding.MGF1(algorithm=hashes.SHA256()), algorithm=hashes.SHA256(), label=None)
+PEM_PREFIX = b"-----BEGIN"
+
+# Funkcja tworząca parę kluczy RSA odbiorcy (istniejące pliki nie są nadpisywane).
+# Klucz prywatny jest zaszyfrowany hasłem, jeśli je podano.
+def generate_rsa_keypair(private_key_path, public_key_path, password=None, key_size=RSA_KEY_SIZE):
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=key_size)
+    if password is not None:
+        encryption = serialization.BestAvailableEncryption(password.encode("utf-8"))
+    else:
+        encryption = serialization.NoEncryption()
+    with open(private_key_path, "xb") as f:
+        f.write(private_key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, encryption
+        ))
+    with open(public_key_path, "xb") as f:
+        f.write(private_key.public_key().public_bytes(
+            serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+        ))
+    logging.info(f"Utworzono parę kluczy RSA: {private_key_path}, {public_key_path}")
+    return private_key_path, public_key_path
+
+# Identyfikator klucza publicznego zapisywany w nagłówku (skrót SHA-256 postaci DER)
+def public_key_id(public_key):
+    der = public_key.public_bytes(serialization.Encoding.DER, serialization.PublicFormat.SubjectPublicKeyInfo)
+    return hashlib.sha256(der).digest()[:KEY_ID_SIZE]
+
+# Funkcja odczytu klucza publicznego z pamięcią podręczną; klucz jest wczytywany ponownie tylko po zmianie pliku
+@functools.lru_cache(maxsize=64)
+def read_public_key(public_key_path, modified_ns):
+    with open(public_key_path, "rb") as f:
+        public_key = serialization.load_pem_public_key(f.read())
+    if not isinstance(public_key, rsa.RSAPublicKey):
+        raise ValueError(f"Plik nie jest kluczem publicznym RSA: {public_key_path}")
+    logging.info(f"Wczytano klucz publiczny: {public_key_path}")
+    return public_key_id(public_key), public_key
+
+# Funkcja wczytująca klucz publiczny odbiorcy; zwraca (identyfikator klucza, klucz)
+def load_public_key(public_key_path):
+    return read_public_key(os.path.abspath(public_key_path), os.stat(public_key_path).st_mtime_ns)
+
+# Funkcja ustalająca odbiorców: ścieżki do plików PEM albo wczytane już klucze publiczne RSA
+def load_recipients(recipients):
+    public_keys = []
+    for recipient in recipients:
+        if isinstance(recipient, rsa.RSAPublicKey):
+            public_keys.append((public_key_id(recipient), recipient))
+        else:
+            public_keys.append(load_public_key(recipient))
+    return public_keys
+
+# Funkcja odczytu klucza prywatnego RSA (PEM, opcjonalnie zaszyfrowanego hasłem)
+def read_private_key(private_key_path, password=None):
+    with open(private_key_path, "rb") as f:
+        return parse_private_key(f.read(), password, private_key_path)
+
+# Funkcja dekodowania klucza prywatnego RSA z zawartości pliku PEM
+def parse_private_key(data, password=None, private_key_path=""):
+    try:
+        private_key = serialization.load_pem_private_key(
+            data, password=password.encode("utf-8") if password is not None else None
+        )
+    except TypeError:
+        raise ValueError("Klucz prywatny jest zaszyfrowany - podaj hasło.")
+    if not isinstance(private_key, rsa.RSAPrivateKey):
+        raise ValueError(f"Plik nie jest kluczem prywatnym RSA: {private_key_path}")
+    return private_key
+
+# Funkcja szyfrowania klucza pliku kluczem publicznym odbiorcy (wartość rozszerzenia EXT_RECIPIENT_KEY)
+def wrap_recipient_key(key_id, public_key, key):
+    return key_id + public_key.encrypt(key, RSA_OAEP_PADDING)
+
+# Funkcja odszyfrowania klucza pliku kluczem prywatnym; zwraca None, jeśli plik nie ma slotu dla tego klucza
+def unwrap_recipient_key(private_key, header):
+    key_id = public_key_id(private_key.public_key())
+    for slot in header["extensions"].get(EXT_RECIPIENT_KEY, []):
+        if slot[:KEY_ID_SIZE] == key_id:
+            try:
+                return private_key.decrypt(slot[KEY_ID_SIZE:], RSA_OAEP_PADDING)
+            except ValueError:
+                return None
+    return None
+
+# Funkcja ustalająca klucze pliku: z osobnego pliku .key, z nagłówka kontenera przy użyciu klucza głównego
+# lub klucza prywatnego RSA albo z hasła. Plik klucza jest otwierany jeden raz. Zwraca (identyfikator pliku,
+# klucz AES, klucz HMAC, rodzaj klucza KEY_KIND_*); dla kluczy z nagłówka identyfikator i klucz HMAC są puste.
+def load_file_key(key_path, header, password=None):
+    if password is not None and header is not None and header["extensions"].get(EXT_PASSWORD_KEY):
+        key = unwrap_password_key(password, header)
+        if key is not None:
+            return b"", key, b"", KEY_KIND_PASSWORD
+        if key_path is None:
+            raise ValueError("Nieprawidłowe hasło.")
+    if key_path is None:
+        raise ValueError("Brak pliku klucza lub hasła dla tego pliku.")
+    data = read_key_data(key_path)
+    if data.startswith(PEM_PREFIX):
+        if header is None:
+            raise ValueError("Plik w starym formacie wymaga osobnego pliku .key.")
+        # Hasło (jeśli podano) odblokowuje zaszyfrowany klucz prywatny
+        key = unwrap_recipient_key(parse_private_key(data, password, key_path), header)
+        if key is None:
+            raise ValueError("Klucz nie pasuje do tego pliku!")
+        return b"", key, b"", KEY_KIND_PRIVATE
+    master_key = parse_master_key(data)
+    if master_key is None:
+        return (*parse_key_file(data), KEY_KIND_FILE)
+    if header is None:
+        raise ValueError("Plik w starym formacie wymaga osobnego pliku .key.")
+    key = unwrap_file_key(master_key, header)
+    if key is None:
+        raise ValueError("Klucz nie pasuje do tego pliku!")
+    return b"", key, b"", KEY_KIND_MASTER
+
+# Plik tylko do odczytu z dostępem swobodnym do odszyfrowanej zawartości kontenera.
+# Odszyfrowywane i weryfikowane są wyłącznie segmenty obejmujące czytany zakres.
+class EncryptedFileReader(io.RawIOBase):
+    def __init__(self, file_path, key):
+        super().__init__()
+        self._file = open(file_path, "rb")
+        try:
+            header = read_container_header(self._file)
+            if header is None:
+                raise ValueError("Dostęp swobodny wymaga pliku w formacie kontenera segmentowego.")
+            if header["version"] != FORMAT_SEGMENTED:
+                raise ValueError("Dostęp swobodny do archiwum jest możliwy tylko przez extract_archive.")
+            if header["compression"] != COMPRESSION_NONE:
+                raise ValueError("Dostęp swobodny nie jest dostępny dla plików skompresowanych.")
+
+            self.header = header
+            self._key = key
+            self._data_offset = len(header["raw"])
+            self._segment_size = header["segment_size"]
+            self._block_size = self._segment_size + TAG_SIZE
+
+            # Liczba segmentów i rozmiar tekstu jawnego wynikają z rozmiaru pliku
+            data_size = os.fstat(self._file.fileno()).st_size - self._data_offset
+            self._segment_count, self.size = segment_layout(data_size, self._segment_size)
+        except Exception:
+            self._file.close()
+            raise
+
+        self._position = 0
+        self._cached_index = None
+        self._cached_plaintext = b""
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        elif whence == io.SEEK_END:
+            position = self.size + offset
+        else:
+            raise ValueError(f"Nieprawidłowa wartość whence: {whence}")
+        if position < 0:
+            raise ValueError(f"Nieprawidłowa pozycja w pliku: {position}")
+        self._position = position
+        return position
+
+    # Odszyfrowanie pojedynczego segmentu (ostatnio użyty segment jest zapamiętywany)
+    def _read_segment(self, index):
+        if index != self._cached_index:
+            self._file.seek(self._data_offset + index * self._block_size)
+            block = read_exact(self._file, self._block_size)
+            last = index == self._segment_count - 1
+            self._cached_plaintext = decrypt_segment(
+                self._key, self.header["nonce_prefix"], index, last, self.header["raw"], block
+            )
+            self._cached_index = index
+        return self._cached_plaintext
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self.size - self._position
+        end = min(self._position + size, self.size)
+        parts = []
+        while self._position < end:
+            index, segment_offset = divmod(self._position, self._segment_size)
+            plaintext = self._read_segment(index)
+            part = plaintext[segment_offset:segment_offset + end - self._position]
+            parts.append(part)
+            self._position += len(part)
+        return b"".join(parts)
+
+    def readall(self):
+        return self.read()
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def close(self):
+        if not self.closed:
+            self._file.close()
+            self._cached_plaintext = b""
+        super().close()
+
+# Funkcja otwierająca zaszyfrowany plik do odczytu z dostępem swobodnym (seek/read)
+def open_encrypted(file_path, key_path, password=None):
+    with open(file_path, "rb") as f:
+        header = read_container_header(f)
+    _, key, _, _ = load_file_key(key_path, header, password)
+    if len(key) != 32:
+        raise ValueError("Niewłaściwa długość klucza AES.")
+    return EncryptedFileReader(file_path, key)
+
+# Funkcja odszyfrowania wybranego zakresu pliku bez odszyfrowywania całości
+def decrypt_range(file_path, key_path, offset, length, password=None):
+    with open_encrypted(file_path, key_path, password) as f:
+        f.seek(offset)
+        data = f.read(length)
+    logging.info(f"Odszyfrowano zakres {offset}-{offset + len(data)} pliku: {file_path}")
+    return data
+
+# Funkcja szyfrowania dowolnego strumienia binarnego (także potoku bez seek) do strumienia dst w stałej pamięci.
+# key_path wskazuje klucz główny (klucz strumienia trafia do nagłówka) albo nowy plik .key zapisywany na końcu.
+# Zwraca liczbę bajtów tekstu jawnego.
+def encrypt_stream(src, dst, key_path, compress=False, chunk_size=CHUNK_SIZE, buffers=None):
+    validate_chunk_size(chunk_size)
+    buffers = buffers or BufferPool()
+    master_key = read_master_key(key_path) if os.path.isfile(key_path) else None
+    if master_key is None and os.path.exists(key_path):
+        raise ValueError(f"Plik klucza już istnieje i nie jest kluczem głównym: {key_path}")
+
+    key = secrets.token_bytes(32)
+    extensions = []
+    if master_key is not None:
+        extensions.append((EXT_WRAPPED_KEY, wrap_file_key(master_key, key)))
+    compression = resolve_compression(compress)
+    if compression and not is_compressible(None, src):
+        logging.info("Pominięto kompresję strumienia: dane wyglądają na skompresowane.")
+        compression = None
+
+    source = src
+    if compression:
+        extensions.append((EXT_COMPRESSION, bytes([COMPRESSION_ALGORITHMS[compression]])))
+        source = CompressingReader(src, compression, chunk_size)
+    nonce_prefix = secrets.token_bytes(NONCE_PREFIX_SIZE)
+    header = build_container_header(chunk_size, nonce_prefix, pack_extensions(extensions))
+    dst.write(header)
+    plaintext_size = encrypt_segments(source, dst, key, nonce_prefix, header, chunk_size, buffers=buffers)
+    if compression:
+        plaintext_size = source.plaintext_size
+    dst.flush()
+    logging.info(f"Zaszyfrowano strumień: {plaintext_size} bajtów")
+
+    if master_key is None:
+        with open(key_path, "xb") as f:
+            f.write(container_file_id(header) + key)
+        logging.info(f"Zapisano klucz AES do pliku: {key_path}")
+    return plaintext_size
+
+# Funkcja odszyfrowania strumienia kontenera segmentowego (także z potoku) do strumienia dst w stałej pamięci.
+# Do dst trafiają wyłącznie zweryfikowane segmenty, ale na potoku nie da się ich cofnąć:
+# wyjątek (np. InvalidTag przy obciętym lub zmienionym strumieniu) oznacza, że wynik należy odrzucić.
+def decrypt_stream(src, dst, key_path, chunk_size=CHUNK_SIZE, buffers=None, password=None):
+    validate_chunk_size(chunk_size)
+    header = read_container_header(src)
+    if header is None:
+        raise ValueError("Odszyfrowanie strumieniowe wymaga formatu kontenera segmentowego.")
+    if header["version"] != FORMAT_SEGMENTED:
+        raise ValueError("Archiwum należy rozpakować przez extract_archive.")
+    _, key, _, _ = load_file_key(key_path, header, password)
+    if len(key) != 32:
+        raise ValueError("Niewłaściwa długość klucza AES.")
+
+    writer = dst
+    if header["compression"] != COMPRESSION_NONE:
+        writer = DecompressingWriter(dst, header["compression"], chunk_size)
+    plaintext_size = decrypt_segments(
+        src, writer, key, header["nonce_prefix"], header["raw"], header["segment_size"], buffers
+    )
+    if writer is not dst:
+        plaintext_size = writer.finish()
+    dst.flush()
+    logging.info(f"Odszyfrowano i zweryfikowano strumień: {plaintext_size} bajtów")
+    return plaintext_size
+
+# Archiwum wielu plików: nagłówek kontenera (wersja FORMAT_ARCHIVE), kolejne pliki zaszyfrowane segmentami,
+# zaszyfrowany spis zawartości (JSON) i stopka wskazująca spis na samym końcu archiwum.
+# Każdy plik i spis mają własny prefiks nonce, więc każdy z nich można odszyfrować niezależnie od reszty.
+ARCHIVE_EXTENSION = ".cnar"
+ARCHIVE_FOOTER = struct.Struct(">QQ4s")  # położenie spisu, długość spisu, magia
+ARCHIVE_FOOTER_MAGIC = b"CNAX"
+ARCHIVE_INDEX_NUMBER = 2 ** 32 - 1       # numer prefiksu nonce zarezerwowany dla spisu
+
+# Prefiks nonce pliku w archiwum: początek losowego prefiksu z nagłówka + numer pliku
+def archive_nonce_prefix(header_prefix, number):
+    return header_prefix[:NONCE_PREFIX_SIZE - 4] + number.to_bytes(4, "big")
+
+# Strumień ograniczony do fragmentu pliku (offset, size) - źródło segmentów jednego pliku archiwum
+class SectionReader:
+    def __init__(self, f, offset, size):
+        f.seek(offset)
+        self._file = f
+        self._remaining = size
+
+    def readinto(self, buffer):
+        if self._remaining <= 0:
+            return 0
+        with memoryview(buffer) as view:
+            size = self._file.readinto(view[:min(len(view), self._remaining)])
+        self._remaining -= size
+        return size
+
+# Generator plików katalogu w stałej kolejności (ścieżki bezwzględne)
+def iter_tree_files(root, skip=()):
+    for directory, subdirectories, files in os.walk(root):
+        subdirectories.sort()
+        for name in sorted(files):
+            path = os.path.join(directory, name)
+            if os.path.abspath(path) not in skip:
+                yield path
+
+# Funkcja tworząca zaszyfrowane archiwum katalogu; zwraca (ścieżka archiwum, ścieżka klucza).
+# Z kluczem głównym (key_path) klucz archiwum trafia do nagłówka, w przeciwnym razie do pliku .key.
+def create_archive(root, archive_path=None, key_path=None, compress=False, chunk_size=CHUNK_SIZE, buffers=None):
+    validate_chunk_size(chunk_size)
+    root = os.path.abspath(root)
+    if not os.path.isdir(root):
+        raise ValueError(f"Katalog do zarchiwizowania nie istnieje: {root}")
+    archive_path = os.path.abspath(archive_path or root + ARCHIVE_EXTENSION)
+    compression = resolve_compression(compress)
+    buffers = buffers or BufferPool()
+    logging.info(f"Rozpoczęto tworzenie archiwum {archive_path} z katalogu {root}")
+
+    key = secrets.token_bytes(32)
+    extensions = []
+    master_key = None
+    if key_path is not None:
+        master_key = read_master_key(key_path)
+        if master_key is None:
+            raise ValueError(f"Plik nie jest kluczem głównym: {key_path}")
+        extensions.append((EXT_WRAPPED_KEY, wrap_file_key(master_key, key)))
+    nonce_prefix = secrets.token_bytes(NONCE_PREFIX_SIZE)
+    header = build_container_header(chunk_size, nonce_prefix, pack_extensions(extensions), FORMAT_ARCHIVE)
+
+    members = []
+    partial_path = archive_path + ".part"
+    try:
+        with open(partial_path, "wb") as dst:
+            dst.write(header)
+            for number, path in enumerate(iter_tree_files(root, skip={archive_path, partial_path})):
+                if number >= ARCHIVE_INDEX_NUMBER:
+                    raise ValueError("Przekroczono maksymalną liczbę plików w archiwum.")
+                offset = dst.tell()
+                with open(path, "rb") as src:
+                    member_compression = compression if compression and is_compressible(path, src) else None
+                    if member_compression:
+                        source = CompressingReader(src, member_compression, chunk_size)
+                        encrypt_segments(
+                            source, dst, key, archive_nonce_prefix(nonce_prefix, number), header, chunk_size,
+                            buffers=buffers,
+                        )
+                        size = source.plaintext_size
+                    else:
+                        size = encrypt_segments(
+                            src, dst, key, archive_nonce_prefix(nonce_prefix, number), header, chunk_size,
+                            buffers=buffers,
+                        )
+                members.append({
+                    "path": os.path.relpath(path, root).replace(os.sep, "/"),
+                    "size": size,
+                    "mtime": os.path.getmtime(path),
+                    "offset": offset,
+                    "length": dst.tell() - offset,
+                    "compression": COMPRESSION_ALGORITHMS[member_compression] if member_compression else COMPRESSION_NONE,
+                })
+
+            # Spis zawartości szyfrowany osobno; stopka o stałym rozmiarze wskazuje jego położenie
+            index = json.dumps({"members": members}, ensure_ascii=False).encode("utf-8")
+            index_offset = dst.tell()
+            encrypt_segments(
+                io.BytesIO(index), dst, key, archive_nonce_prefix(nonce_prefix, ARCHIVE_INDEX_NUMBER), header,
+                chunk_size, buffers=buffers,
+            )
+            dst.write(ARCHIVE_FOOTER.pack(index_offset, dst.tell() - index_offset, ARCHIVE_FOOTER_MAGIC))
+        os.replace(partial_path, archive_path)
+    finally:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+    logging.info(f"Zapisano archiwum {archive_path}: {len(members)} plików")
+
+    if master_key is None:
+        # Identyfikatorem archiwum w pliku .key jest skrót spisu zawartości
+        key_path = archive_path + ".key"
+        with open(key_path, "wb") as f:
+            f.write(hashlib.sha256(index).digest() + key)
+        logging.info(f"Zapisano klucz archiwum do pliku: {key_path}")
+    return archive_path, key_path
+
+# Funkcja odczytu nagłówka, klucza i spisu zawartości archiwum; odszyfrowywany jest wyłącznie spis
+def read_archive_index(f, key_path):
+    header = read_container_header(f)
+    if header is None or header["version"] != FORMAT_ARCHIVE:
+        raise ValueError("Plik nie jest zaszyfrowanym archiwum.")
+    _, key, _, _ = load_file_key(key_path, header)
+    if len(key) != 32:
+        raise ValueError("Niewłaściwa długość klucza AES.")
+
+    archive_size = os.fstat(f.fileno()).st_size
+    footer_offset = archive_size - ARCHIVE_FOOTER.size
+    if footer_offset < len(header["raw"]):
+        raise ValueError("Archiwum jest uszkodzone lub obcięte.")
+    f.seek(footer_offset)
+    index_offset, index_length, magic = ARCHIVE_FOOTER.unpack(read_exact(f, ARCHIVE_FOOTER.size))
+    if magic != ARCHIVE_FOOTER_MAGIC or index_offset < len(header["raw"]) or index_offset + index_length > footer_offset:
+        raise ValueError("Archiwum jest uszkodzone lub obcięte.")
+
+    index = io.BytesIO()
+    decrypt_segments(
+        SectionReader(f, index_offset, index_length), index, key,
+        archive_nonce_prefix(header["nonce_prefix"], ARCHIVE_INDEX_NUMBER), header["raw"], header["segment_size"],
+    )
+    return header, key, json.loads(index.getvalue().decode("utf-8"))["members"]
+
+# Funkcja wyświetlania zawartości archiwum bez odszyfrowywania plików
+def list_archive(archive_path, key_path):
+    with open(archive_path, "rb") as f:
+        _, _, members = read_archive_index(f, key_path)
+    logging.info(f"Odczytano spis archiwum {archive_path}: {len(members)} plików")
+    return [{"path": member["path"], "size": member["size"], "mtime": member["mtime"]} for member in members]
+
+# Funkcja rozpakowania archiwum (całego albo wybranych plików); zwraca listę zapisanych ścieżek.
+# Odszyfrowywane są tylko segmenty wybranych plików, a każdy plik pojawia się dopiero po pełnej weryfikacji.
+def extract_archive(archive_path, key_path, destination=None, members=None, buffers=None):
+    destination = os.path.abspath(destination or os.path.splitext(archive_path)[0])
+    buffers = buffers or BufferPool()
+    extracted = []
+    with open(archive_path, "rb") as f:
+        header, key, entries = read_archive_index(f, key_path)
+        if members is not None:
+            members = set(members)
+            missing = members - {entry["path"] for entry in entries}
+            if missing:
+                raise ValueError(f"Brak plików w archiwum: {', '.join(sorted(missing))}")
+
+        for number, entry in enumerate(entries):
+            if members is not None and entry["path"] not in members:
+                continue
+            target = os.path.abspath(os.path.join(destination, *entry["path"].split("/")))
+            if os.path.commonpath([destination, target]) != destination:
+                raise ValueError(f"Niedozwolona ścieżka w archiwum: {entry['path']}")
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+
+            partial_path = target + ".part"
+            try:
+                with open(partial_path, "wb") as dst:
+                    writer = dst
+                    if entry["compression"] != COMPRESSION_NONE:
+                        writer = DecompressingWriter(dst, entry["compression"], header["segment_size"])
+                    decrypt_segments(
+                        SectionReader(f, entry["offset"], entry["length"]), writer, key,
+                        archive_nonce_prefix(header["nonce_prefix"], number), header["raw"], header["segment_size"],
+                        buffers,
+                    )
+                    if writer is not dst:
+                        writer.finish()
+                os.replace(partial_path, target)
+            finally:
+                if os.path.exists(partial_path):
+                    os.remove(partial_path)
+            os.utime(target, (entry["mtime"], entry["mtime"]))
+            extracted.append(target)
+    logging.info(f"Rozpakowano archiwum {archive_path} do {destination}: {len(extracted)} plików")
+    return extracted
+
+# Cel zapisu, który odrzuca dane (weryfikacja bez zapisywania tekstu jawnego)
+class NullWriter:
+    def write(self, data):
+        return len(data)
+
+# Domyślna ścieżka pliku .key dla pliku zaszyfrowanego (plik.txt.enc -> plik.txt.key, archiwum.cnar -> archiwum.cnar.key)
+def default_key_path(file_path):
+    if file_path.endswith(".enc"):
+        return file_path[:-len(".enc")] + ".key"
+    return file_path + ".key"
+
+# Funkcja weryfikacji integralności pliku bez zapisywania tekstu jawnego; zwraca True, jeśli plik jest nienaruszony.
+# Stary format jest sprawdzany samym HMAC szyfrogramu, kontener i archiwum - tagami GCM wszystkich segmentów.
+def verify_file(file_path, key_path, chunk_size=CHUNK_SIZE, buffers=None, password=None):
+    validate_chunk_size(chunk_size)
+    buffers = buffers or BufferPool()
+    with open(file_path, "rb") as src:
+        header = read_container_header(src)
+        _, key, hmac_key, _ = load_file_key(key_path, header, password)
+        if len(key) != 32:
+            raise ValueError("Niewłaściwa długość klucza AES.")
+
+        if header is None:
+            with open(file_path + ".hmac", "rb") as f:
+                hmac_digest = f.read()
+            hmac_verifier = hmac.HMAC(hmac_key, hashes.SHA256(), backend=default_backend())
+            src.seek(16)
+            buffer = buffers.acquire(chunk_size)
+            try:
+                with memoryview(buffer) as view:
+                    while size := src.readinto(view):
+                        hmac_verifier.update(view[:size])
+            finally:
+                buffers.release(buffer)
+            try:
+                hmac_verifier.verify(hmac_digest)
+                return True
+            except InvalidSignature:
+                return False
+
+        try:
+            if header["version"] == FORMAT_ARCHIVE:
+                src.seek(0)
+                _, _, members = read_archive_index(src, key_path)
+                for number, member in enumerate(members):
+                    decrypt_segments(
+                        SectionReader(src, member["offset"], member["length"]), NullWriter(), key,
+                        archive_nonce_prefix(header["nonce_prefix"], number), header["raw"], header["segment_size"],
+                        buffers,
+                    )
+            else:
+                decrypt_segments(
+                    src, NullWriter(), key, header["nonce_prefix"], header["raw"], header["segment_size"], buffers
+                )
+            return True
+        except InvalidTag:
+            return False
+
+# Funkcja równoległej weryfikacji wszystkich plików .enc i archiwów w katalogu.
+# Dla każdego pliku używany jest jego plik .key, a gdy go brak - key_path (np. klucz główny).
+# Zwraca raport (słownik na plik: path, status ok/corrupt/error, bytes, duration, error);
+# z report_path raport jest zapisywany także jako JSON Lines.
+def verify_tree(root, workers=DEFAULT_BATCH_WORKERS, key_path=None, report_path=None, progress=None):
+    paths = [path for path in iter_tree_files(root) if path.endswith((".enc", ARCHIVE_EXTENSION))]
+    buffers = BufferPool(max_idle=3 * max(1, workers))
+
+    def verify_one(path):
+        result = {"path": path, "status": "error", "bytes": 0, "duration": 0.0, "error": None}
+        start = time.perf_counter()
+        try:
+            result["bytes"] = os.path.getsize(path)
+            file_key_path = default_key_path(path)
+            if not os.path.isfile(file_key_path) and key_path is not None:
+                file_key_path = key_path
+            result["status"] = "ok" if verify_file(path, file_key_path, buffers=buffers) else "corrupt"
+        except Exception as e:
+            result["error"] = str(e) or type(e).__name__
+        result["duration"] = time.perf_counter() - start
+        if progress is not None:
+            progress(result)
+        return result
+
+    logging.info(f"Rozpoczęto weryfikację {len(paths)} plików w katalogu {root} (wątki: {workers})")
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        results = list(executor.map(verify_one, paths))
+
+    if report_path is not None:
+        with open(report_path, "w", encoding="utf-8") as f:
+            for result in results:
+                f.write(json.dumps(result, ensure_ascii=False) + "\n")
+    corrupt = sum(1 for result in results if result["status"] == "corrupt")
+    failed = sum(1 for result in results if result["status"] == "error")
+    logging.info(
+        f"Zakończono weryfikację: {len(results) - corrupt - failed} poprawnych, {corrupt} uszkodzonych, {failed} błędów"
+    )
+    return results
+
+# Parametry hashowania haseł
+PASSWORD_ITERATIONS = 120000
+PASSWORD_SALT_BYTES = 16
+# Skrót hasła jest odświeżany, gdy liczba iteracji spadła poniżej tej części bieżącej wartości skalibrowanej
+# (tolerancja chroni przed ponownym hashowaniem przy każdym logowaniu z powodu wahań kalibracji)
+PASSWORD_REHASH_RATIO = 0.8
+# Domyślna liczba wątków hashujących hasła (usługa uwierzytelniania i migracja haseł)
+DEFAULT_AUTH_WORKERS = min(8, os.cpu_count() or 1)
+
+
+# Funkcja walidująca złożoność hasła
+def validate_password_strength(password):
+    errors = []
+    if len(password) < 10:
+        errors.append("Hasło musi mieć co najmniej 10 znaków.")
+    if not any(char.isupper() for char in password):
+        errors.append("Hasło musi zawierać wielką literę.")
+    if not any(char.islower() for char in password):
+        errors.append("Hasło musi zawierać małą literę.")
+    if not any(char.isdigit() for char in password):
+        errors.append("Hasło musi zawierać cyfrę.")
+    if not any(char in "!@#$%^&*()_-+=[]{};:'\",.<>?/" for char in password):
+        errors.append("Hasło musi zawierać znak specjalny.")
+    return errors
+
+
+# Funkcja hashowania hasła (PBKDF2); bez podanej liczby iteracji używana jest wartość skalibrowana
+# do DEFAULT_KDF_TARGET_MS na tym komputerze (nie mniej niż PASSWORD_ITERATIONS)
+def hash_password(password, salt=None, iterations=None):
+    salt = salt or secrets.token_bytes(PASSWORD_SALT_BYTES)
+    iterations = iterations or calibrate_kdf("pbkdf2")["iterations"]
+    derived = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations)
+    return derived.hex(), salt.hex(), iterations
+
+
+def verify_password(password, user_record):
+    """Sprawdza hasło zarówno dla nowych, jak i starszych kont."""
+    if "salt" in user_record:
+        stored_hash = user_record.get("password_hash", "")
+        salt = bytes.fromhex(user_record.get("salt", ""))
+        iterations = user_record.get("iterations", PASSWORD_ITERATIONS)
+        new_hash, _, _ = hash_password(password, salt=salt, iterations=iterations)
+        return secrets.compare_digest(stored_hash, new_hash)
+
+    # Obsługa starszego schematu SHA-256 bez soli
+    legacy_hash = hashlib.sha256(password.encode()).hexdigest()
+    return secrets.compare_digest(user_record.get("password_hash", ""), legacy_hash)
+
+# Funkcja sprawdzająca, czy skrót hasła trzeba przeliczyć: stary SHA-256 bez soli albo za mało iteracji PBKDF2
+def needs_rehash(user_record, iterations=None):
+    if "salt" not in user_record:
+        return True
+    iterations = iterations or calibrate_kdf("pbkdf2")["iterations"]
+    return user_record.get("iterations", PASSWORD_ITERATIONS) < iterations * PASSWORD_REHASH_RATIO
+
+# Funkcja zapisująca nowy skrót hasła z bieżącymi parametrami (po poprawnej weryfikacji hasła)
+def rehash_password(store, username, password, iterations=None):
+    password_hash, salt, iterations = hash_password(password, iterations=iterations)
+    return store.update_user(username, password_hash=password_hash, salt=salt, iterations=iterations)
+
+# Magazyny kont użytkowników. Domyślnie SQLite z unikalnymi indeksami na znormalizowanej nazwie i adresie
+# e-mail (wyszukiwanie O(log n), zapis jednego wiersza w transakcji). JsonUserStore zachowuje dawny plik users.json.
+USERS_JSON = "users.json"
+USERS_DB = "users.db"
+USER_FIELDS = ("username", "email", "password_hash", "salt", "iterations", "created_at")
+
+
+# Funkcja normalizacji nazwy użytkownika i adresu e-mail (porównania bez rozróżniania wielkości liter)
+def normalize_user_key(value):
+    return value.lower() if value else None
+
+
+# Magazyn kont w bazie SQLite; każdy wątek ma własne połączenie z bazą
+class SqliteUserStore:
+    def __init__(self, db_path=USERS_DB):
+        self.db_path = db_path
+        self._local = threading.local()
+        with self.connect() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS users (
+                    id INTEGER PRIMARY KEY,
+                    username TEXT NOT NULL,
+                    username_key TEXT NOT NULL UNIQUE,
+                    email TEXT NOT NULL DEFAULT '',
+                    email_key TEXT UNIQUE,
+                    password_hash TEXT NOT NULL,
+                    salt TEXT,
+                    iterations INTEGER,
+                    created_at TEXT
+                );
+                CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            """)
+
+    # Połączenie bieżącego wątku (tryb WAL: odczyty nie blokują zapisów)
+    def connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    # Zamiana wiersza na słownik w formacie rekordu z users.json (bez pustych pól)
+    @staticmethod
+    def to_record(row):
+        if row is None:
+            return None
+        return {name: row[name] for name in USER_FIELDS if row[name] is not None}
+
+    def get_user(self, username):
+        row = self.connect().execute(
+            "SELECT * FROM users WHERE username_key = ?", (normalize_user_key(username),)
+        ).fetchone()
+        return self.to_record(row)
+
+    def get_user_by_email(self, email):
+        row = self.connect().execute(
+            "SELECT * FROM users WHERE email_key = ?", (normalize_user_key(email),)
+        ).fetchone()
+        return self.to_record(row)
+
+    # Dodanie konta; zwraca False, jeśli nazwa użytkownika lub e-mail są już zajęte
+    def add_user(self, record):
+        try:
+            with self.connect() as conn:
+                conn.execute(
+                    "INSERT INTO users (username, username_key, email, email_key, password_hash, salt, iterations, "
+                    "created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        record["username"], normalize_user_key(record["username"]), record.get("email") or "",
+                        normalize_user_key(record.get("email")), record["password_hash"], record.get("salt"),
+                        record.get("iterations"), record.get("created_at"),
+                    ),
+                )
+            return True
+        except sqlite3.IntegrityError:
+            return False
+
+    # Aktualizacja pól konta (np. nowego skrótu hasła); zwraca False, jeśli konto nie istnieje
+    def update_user(self, username, **fields):
+        unknown = set(fields) - set(USER_FIELDS[2:])
+        if unknown:
+            raise ValueError(f"Nieobsługiwane pola konta: {', '.join(sorted(unknown))}")
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self.connect() as conn:
+            cursor = conn.execute(
+                f"UPDATE users SET {assignments} WHERE username_key = ?",
+                (*fields.values(), normalize_user_key(username)),
+            )
+        return cursor.rowcount == 1
+
+    def iter_users(self):
+        for row in self.connect().execute("SELECT * FROM users ORDER BY id"):
+            yield self.to_record(row)
+
+    # Jednorazowa migracja kont z users.json w jednej transakcji; plik JSON pozostaje bez zmian jako kopia.
+    # Zwraca liczbę przeniesionych kont (0, jeśli migrację wykonano wcześniej).
+    def migrate_from_json(self, json_path=USERS_JSON):
+        conn = self.connect()
+        if not os.path.exists(json_path):
+            return 0
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'migrated_json'").fetchone():
+            return 0
+        with open(json_path, "r") as f:
+            users = json.load(f).get("users", [])
+        migrated = 0
+        with conn:
+            for user in users:
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO users (username, username_key, email, email_key, password_hash, salt, "
+                    "iterations, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        user["username"], normalize_user_key(user["username"]), user.get("email") or "",
+                        normalize_user_key(user.get("email")), user["password_hash"], user.get("salt"),
+                        user.get("iterations"), user.get("created_at"),
+                    ),
+                )
+                migrated += cursor.rowcount
+            conn.execute(
+                "INSERT INTO meta (key, value) VALUES ('migrated_json', ?)", (os.path.abspath(json_path),)
+            )
+        if migrated != len(users):
+            logging.warning(f"Pominięto {len(users) - migrated} zduplikowanych kont z pliku {json_path}")
+        logging.info(f"Przeniesiono {migrated} kont z pliku {json_path} do bazy {self.db_path}")
+        return migrated
+
+
+# Magazyn kont w pliku users.json (dawny format); plik jest wczytywany raz i indeksowany w pamięci
+class JsonUserStore:
+    def __init__(self, json_path=USERS_JSON):
+        self.json_path = json_path
+        self._lock = threading.Lock()
+        self._users = None
+        self._by_username = {}
+        self._by_email = {}
+
+    def load(self):
+        if self._users is None:
+            users = []
+            if os.path.exists(self.json_path):
+                with open(self.json_path, "r") as f:
+                    users = json.load(f).get("users", [])
+            self._users = users
+            self._by_username = {normalize_user_key(user["username"]): user for user in users}
+            self._by_email = {normalize_user_key(user["email"]): user for user in users if user.get("email")}
+        return self._users
+
+    # Zapis całego pliku przez plik tymczasowy, aby przerwany zapis nie uszkodził bazy kont
+    def save(self):
+        partial_path = self.json_path + ".part"
+        with open(partial_path, "w") as f:
+            json.dump({"users": self._users}, f, indent=4)
+        os.replace(partial_path, self.json_path)
+
+    def get_user(self, username):
+        with self._lock:
+            self.load()
+            return self._by_username.get(normalize_user_key(username))
+
+    def get_user_by_email(self, email):
+        with self._lock:
+            self.load()
+            return self._by_email.get(normalize_user_key(email))
+
+    def add_user(self, record):
+        with self._lock:
+            self.load()
+            username_key, email_key = normalize_user_key(record["username"]), normalize_user_key(record.get("email"))
+            if username_key in self._by_username or (email_key and email_key in self._by_email):
+                return False
+            self._users.append(record)
+            self._by_username[username_key] = record
+            if email_key:
+                self._by_email[email_key] = record
+            self.save()
+            return True
+
+    def update_user(self, username, **fields):
+        with self._lock:
+            self.load()
+            user = self._by_username.get(normalize_user_key(username))
+            if user is None:
+                return False
+            user.update(fields)
+            self.save()
+            return True
+
+    def iter_users(self):
+        with self._lock:
+            return iter(list(self.load()))
+
+
+USER_STORE = None
+USER_STORE_LOCK = threading.Lock()
+
+
+# Funkcja zwracająca magazyn kont; domyślnie baza SQLite z jednorazową migracją kont z users.json
+def get_user_store():
+    global USER_STORE
+    with USER_STORE_LOCK:
+        if USER_STORE is None:
+            store = SqliteUserStore(USERS_DB)
+            store.migrate_from_json(USERS_JSON)
+            USER_STORE = store
+        return USER_STORE
+
+
+# Funkcja ustawiająca magazyn kont (np. JsonUserStore albo własna implementacja z tymi samymi metodami)
+def set_user_store(store):
+    global USER_STORE
+    with USER_STORE_LOCK:
+        USER_STORE = store
+
+
+# Funkcja rejestracji użytkownika
+def register_user(username, password, email=None, store=None):
+    store = store or get_user_store()
+    if store.get_user(username) is not None:
+        return False  # Użytkownik już istnieje
+    if email and store.get_user_by_email(email) is not None:
+        return False  # Email już użyty
+
+    password_hash, salt, iterations = hash_password(password)
+
+    # Unikalne indeksy magazynu odrzucają także konto dodane równolegle przez inny wątek
+    return store.add_user({
+        "username": username,
+        "email": email or "",
+        "password_hash": password_hash,
+        "salt": salt,
+        "iterations": iterations,
+        "created_at": datetime.datetime.utcnow().isoformat() + "Z",
+    })
+
+# Funkcja logowania użytkownika
+def login_user(username, password, store=None):
+    store = store or get_user_store()
+    user = store.get_user(username)
+    if user is None:
+        return False  # Nieprawidłowa nazwa użytkownika
+    if not verify_password(password, user):
+        return False
+
+    # Przy udanym logowaniu stary lub zbyt słaby skrót hasła jest zastępowany nowym
+    if needs_rehash(user):
+        try:
+            rehash_password(store, user["username"], password)
+            logging.info(f"Zaktualizowano skrót hasła użytkownika: {user['username']}")
+        except Exception as e:
+            logging.error(f"Błąd podczas aktualizacji skrótu hasła użytkownika {user['username']}: {e}")
+    return True
+
+
+# Domyślny rozmiar partii masowej migracji haseł
+PASSWORD_MIGRATION_BATCH = 500
+
+
+# Funkcja zapisu punktu kontrolnego migracji (liczba przetworzonych rekordów źródła)
+def write_migration_checkpoint(checkpoint_path, summary):
+    partial_path = checkpoint_path + ".part"
+    with open(partial_path, "w", encoding="utf-8") as f:
+        json.dump(summary, f)
+    os.replace(partial_path, checkpoint_path)
+
+
+# Masowa migracja skrótów haseł offline. Źródło (feed_path) to plik JSON Lines z rekordami
+# {"username": ..., "password": ...} dostarczonymi przez import kont. Rekordy są przetwarzane partiami,
+# każda partia równolegle w puli wątków; po każdej partii zapisywany jest punkt kontrolny, więc
+# przerwaną migrację można wznowić. Skrót jest zmieniany tylko wtedy, gdy hasło z importu pasuje
+# do zapisanego skrótu. Zwraca podsumowanie z liczbą rekordów w każdej kategorii.
+def migrate_passwords(feed_path, store=None, workers=DEFAULT_AUTH_WORKERS, batch_size=PASSWORD_MIGRATION_BATCH,
+                      checkpoint_path=None, progress=None, iterations=None):
+    store = store or get_user_store()
+    iterations = iterations or calibrate_kdf("pbkdf2")["iterations"]
+    summary = {"processed": 0, "upgraded": 0, "current": 0, "mismatch": 0, "missing": 0, "skipped": 0, "errors": 0}
+    if checkpoint_path is not None and os.path.exists(checkpoint_path):
+        with open(checkpoint_path, "r", encoding="utf-8") as f:
+            summary.update(json.load(f))
+        logging.info(f"Wznowiono migrację haseł od rekordu {summary['processed']}")
+    skip = summary["processed"]
+
+    def migrate_one(line):
+        if not line.strip():
+            return "skipped"
+        try:
+            entry = json.loads(line)
+            user = store.get_user(entry["username"])
+            if user is None:
+                return "missing"
+            if not verify_password(entry["password"], user):
+                return "mismatch"
+            if not needs_rehash(user, iterations):
+                return "current"
+            rehash_password(store, user["username"], entry["password"], iterations)
+            return "upgraded"
+        except Exception as e:
+            logging.error(f"Błąd migracji hasła: {e}")
+            return "errors"
+
+    def finish_batch(executor, batch):
+        for status in executor.map(migrate_one, batch):
+            summary[status] += 1
+        summary["processed"] += len(batch)
+        if checkpoint_path is not None:
+            write_migration_checkpoint(checkpoint_path, summary)
+        if progress is not None:
+            progress(dict(summary))
+
+    logging.info(f"Rozpoczęto migrację haseł z pliku {feed_path} (wątki: {workers}, partie po {batch_size})")
+    with open(feed_path, "r", encoding="utf-8") as feed, ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        batch = []
+        for number, line in enumerate(feed):
+            if number < skip:
+                continue
+            batch.append(line)
+            if len(batch) == batch_size:
+                finish_batch(executor, batch)
+                batch = []
+        if batch:
+            finish_batch(executor, batch)
+    logging.info(f"Zakończono migrację haseł: {summary}")
+    return summary
+
+
+# Usługa uwierzytelniania: logowanie i rejestracja (PBKDF2) wykonywane w puli wątków.
+# Metody zwracają obiekty Future, więc interfejs graficzny nie czeka na wynik w swoim wątku.
+# hashlib.pbkdf2_hmac zwalnia GIL na czas obliczeń, dzięki czemu równoległe logowania wykorzystują wiele rdzeni.
+class AuthService:
+    def __init__(self, workers=DEFAULT_AUTH_WORKERS, store=None):
+        self.store = store
+        self.executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="auth")
+
+    def login(self, username, password):
+        return self.executor.submit(login_user, username, password, self.store)
+
+    def register(self, username, password, email=None):
+        return self.executor.submit(register_user, username, password, email, self.store)
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
+
+
+AUTH_SERVICE = None
+
+
+# Funkcja zwracająca wspólną usługę uwierzytelniania procesu
+def get_auth_service():
+    global AUTH_SERVICE
+    with USER_STORE_LOCK:
+        if AUTH_SERVICE is None:
+            AUTH_SERVICE = AuthService()
+        return AUTH_SERVICE
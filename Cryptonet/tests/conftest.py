@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Moduły Cryptonet (core, cli, bench, ...) importowane są jako moduły najwyższego poziomu
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
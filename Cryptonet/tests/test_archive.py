@@ -0,0 +1,97 @@
+import os
+
+import pytest
+from cryptography.exceptions import InvalidTag
+
+import core
+
+CHUNK = core.MIN_CHUNK_SIZE
+FILES = {
+    "a.txt": b"tekst " * 3000,
+    "pusty.bin": b"",
+    "sub/b.bin": os.urandom(2 * CHUNK),
+    "sub/gleboko/c.bin": os.urandom(CHUNK + 1),
+}
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / "katalog"
+    for name, data in FILES.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+    return root
+
+
+def read_tree(root):
+    return {
+        os.path.relpath(path, root).replace(os.sep, "/"): open(path, "rb").read()
+        for path in core.iter_tree_files(str(root))
+    }
+
+
+@pytest.mark.parametrize("compress", [False, True])
+@pytest.mark.parametrize("use_master_key", [False, True])
+def test_archive_round_trip(tmp_path, tree, compress, use_master_key):
+    key_path = None
+    if use_master_key:
+        key_path = str(tmp_path / "master.key")
+        core.create_master_key(key_path)
+    archive_path, archive_key = core.create_archive(str(tree), key_path=key_path, compress=compress, chunk_size=CHUNK)
+    assert archive_key == (key_path or archive_path + ".key")
+
+    listing = core.list_archive(archive_path, archive_key)
+    assert {member["path"]: member["size"] for member in listing} == {
+        name: len(data) for name, data in FILES.items()
+    }
+
+    destination = tmp_path / "wynik"
+    extracted = core.extract_archive(archive_path, archive_key, str(destination))
+    assert len(extracted) == len(FILES)
+    assert read_tree(destination) == FILES
+
+
+def test_extract_selected_members(tmp_path, tree):
+    archive_path, key_path = core.create_archive(str(tree), chunk_size=CHUNK)
+    destination = tmp_path / "wynik"
+    core.extract_archive(archive_path, key_path, str(destination), members=["sub/b.bin"])
+    assert read_tree(destination) == {"sub/b.bin": FILES["sub/b.bin"]}
+
+    with pytest.raises(ValueError):
+        core.extract_archive(archive_path, key_path, str(destination), members=["brak.txt"])
+
+
+# Zmieniony plik archiwum nie jest zapisywany, a spis zawartości pozostaje czytelny
+def test_tampered_member_is_not_extracted(tmp_path, tree):
+    archive_path, key_path = core.create_archive(str(tree), chunk_size=CHUNK)
+    with open(archive_path, "rb") as f:
+        _, _, entries = core.read_archive_index(f, key_path)
+    offset = next(entry["offset"] for entry in entries if entry["path"] == "sub/b.bin")
+    with open(archive_path, "r+b") as f:
+        f.seek(offset + 10)
+        byte = f.read(1)
+        f.seek(-1, os.SEEK_CUR)
+        f.write(bytes([byte[0] ^ 1]))
+
+    destination = tmp_path / "wynik"
+    with pytest.raises(InvalidTag):
+        core.extract_archive(archive_path, key_path, str(destination), members=["sub/b.bin"])
+    assert not os.path.exists(destination / "sub" / "b.bin")
+    assert not os.path.exists(destination / "sub" / "b.bin.part")
+    assert len(core.list_archive(archive_path, key_path)) == len(FILES)
+
+
+def test_truncated_archive_is_rejected(tmp_path, tree):
+    archive_path, key_path = core.create_archive(str(tree), chunk_size=CHUNK)
+    with open(archive_path, "r+b") as f:
+        f.truncate(os.path.getsize(archive_path) - 1)
+    with pytest.raises(ValueError):
+        core.list_archive(archive_path, key_path)
+
+
+def test_archive_is_not_decrypted_as_file(tmp_path, tree):
+    archive_path, key_path = core.create_archive(str(tree), chunk_size=CHUNK)
+    os.replace(archive_path, archive_path + ".enc")
+    result = core.decrypt_file(archive_path + ".enc", key_path)
+    assert result == "Plik jest zaszyfrowanym archiwum - użyj rozpakowania archiwum."
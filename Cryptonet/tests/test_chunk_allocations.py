@@ -0,0 +1,20 @@
+import bench
+
+POOLED_PEAK_LIMIT = 16 * 1024
+
+
+# Szczyt pamięci pętli szyfrowania z buforami z puli to kilka KB, niezależnie od rozmiaru porcji
+def test_pooled_peak_does_not_grow_with_chunk_size():
+    small = bench.bench_chunk_allocations(chunk_size=64 * 1024, chunks=4)
+    large = bench.bench_chunk_allocations(chunk_size=4 * 1024 * 1024, chunks=4)
+    assert small["pooled_peak_bytes"] < POOLED_PEAK_LIMIT
+    assert large["pooled_peak_bytes"] < POOLED_PEAK_LIMIT
+    assert large["allocating_peak_bytes"] > 4 * 1024 * 1024
+
+
+# ...ani od liczby porcji
+def test_pooled_peak_does_not_grow_with_chunk_count():
+    few = bench.bench_chunk_allocations(chunk_size=64 * 1024, chunks=4)
+    many = bench.bench_chunk_allocations(chunk_size=64 * 1024, chunks=64)
+    assert few["pooled_peak_bytes"] < POOLED_PEAK_LIMIT
+    assert many["pooled_peak_bytes"] < POOLED_PEAK_LIMIT
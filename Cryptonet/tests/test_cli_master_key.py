@@ -0,0 +1,45 @@
+import os
+import subprocess
+import sys
+
+import core
+
+CRYPTONET_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_cli(tmp_path, *args):
+    return subprocess.run(
+        [sys.executable, "cli.py", "--log", str(tmp_path / "operations.log"), *args],
+        cwd=CRYPTONET_DIR, capture_output=True, text=True,
+    )
+
+
+# Kontener jednoplikowy bez pisania kodu: keygen --master, encrypt/verify/decrypt --key
+def test_master_key_workflow(tmp_path):
+    master_key = str(tmp_path / "master.key")
+    source = tmp_path / "dane.txt"
+    source.write_bytes(b"dane" * 1000)
+
+    result = run_cli(tmp_path, "keygen", "--master", master_key)
+    assert result.returncode == 0, result.stderr
+    assert core.read_master_key(master_key) is not None
+
+    assert run_cli(tmp_path, "encrypt", str(source), "--key", master_key, "--delete-original").returncode == 0
+    assert not os.path.exists(tmp_path / "dane.txt.key")
+    assert run_cli(tmp_path, "verify", str(source) + ".enc", "--key", master_key).returncode == 0
+    assert run_cli(tmp_path, "decrypt", str(source) + ".enc", "--key", master_key).returncode == 0
+    assert source.read_bytes() == b"dane" * 1000
+
+
+def test_keygen_never_overwrites_master_key(tmp_path):
+    master_key = tmp_path / "master.key"
+    master_key.write_bytes(b"istniejacy")
+    assert run_cli(tmp_path, "keygen", "--master", str(master_key)).returncode == 1
+    assert master_key.read_bytes() == b"istniejacy"
+
+
+def test_keygen_requires_rsa_paths_or_master(tmp_path):
+    assert run_cli(tmp_path, "keygen").returncode == 2
+    result = run_cli(tmp_path, "keygen", "--master", str(tmp_path / "m.key"), str(tmp_path / "prywatny.pem"))
+    assert result.returncode == 2
+    assert not os.path.exists(tmp_path / "m.key")
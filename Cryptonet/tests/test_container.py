@@ -0,0 +1,109 @@
+import os
+
+import pytest
+
+import core
+
+CHUNK = core.MIN_CHUNK_SIZE
+SIZES = [0, 1, CHUNK, 4 * CHUNK, 4 * CHUNK + 1]
+DECRYPT_MODES = [{}, {"workers": 4}, {"io_mode": "mmap"}, {"io_mode": "mmap", "workers": 4}]
+INTEGRITY_ERROR = "Błąd weryfikacji integralności pliku."
+
+
+def encrypt(tmp_path, data, **options):
+    source = tmp_path / "dane.bin"
+    source.write_bytes(data)
+    encrypted_path, key_path = core.encrypt_file(str(source), chunk_size=CHUNK, raise_errors=True, **options)
+    os.remove(source)
+    return encrypted_path, key_path
+
+
+def header_size(encrypted_path):
+    with open(encrypted_path, "rb") as f:
+        return len(core.read_container_header(f)["raw"])
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_legacy_round_trip(tmp_path, size):
+    data = os.urandom(size)
+    encrypted_path, key_path = encrypt(tmp_path, data, format_version=core.FORMAT_LEGACY)
+    assert core.decrypt_file(encrypted_path, key_path, chunk_size=CHUNK) == str(tmp_path / "dane.bin")
+    assert (tmp_path / "dane.bin").read_bytes() == data
+
+
+@pytest.mark.parametrize("size", SIZES)
+@pytest.mark.parametrize("encrypt_options", [{}, {"workers": 4}, {"io_mode": "mmap"}, {"io_mode": "mmap", "workers": 4}])
+@pytest.mark.parametrize("decrypt_options", DECRYPT_MODES)
+def test_segmented_round_trip(tmp_path, size, encrypt_options, decrypt_options):
+    data = os.urandom(size)
+    encrypted_path, key_path = encrypt(tmp_path, data, **encrypt_options)
+    block_count = max(1, -(-size // CHUNK))
+    assert os.path.getsize(encrypted_path) == header_size(encrypted_path) + size + block_count * core.TAG_SIZE
+    assert core.decrypt_file(encrypted_path, key_path, **decrypt_options) == str(tmp_path / "dane.bin")
+    assert (tmp_path / "dane.bin").read_bytes() == data
+
+
+def truncate(data, offset):
+    return data[:-1]
+
+
+def swap_segments(data, offset):
+    block = CHUNK + core.TAG_SIZE
+    first, second = data[offset:offset + block], data[offset + block:offset + 2 * block]
+    return data[:offset] + second + first + data[offset + 2 * block:]
+
+
+def flip_bit(data, offset):
+    data = bytearray(data)
+    data[offset + CHUNK // 2] ^= 1
+    return bytes(data)
+
+
+def append_data(data, offset):
+    return data + os.urandom(CHUNK + core.TAG_SIZE)
+
+
+def drop_last_segment(data, offset):
+    return data[:-(1 + core.TAG_SIZE)]  # ostatni segment zawiera 1 bajt tekstu jawnego
+
+
+# Każda zmiana szyfrogramu kończy się błędem integralności, a plik wynikowy nie powstaje
+# (w trybie mmap także bez BufferError z niezwolnionych wycinków mapowania)
+@pytest.mark.parametrize("tamper", [truncate, swap_segments, flip_bit, append_data, drop_last_segment])
+@pytest.mark.parametrize("decrypt_options", DECRYPT_MODES)
+def test_segmented_tamper_is_detected(tmp_path, tamper, decrypt_options):
+    encrypted_path, key_path = encrypt(tmp_path, os.urandom(4 * CHUNK + 1))
+    offset = header_size(encrypted_path)
+    with open(encrypted_path, "rb") as f:
+        data = f.read()
+    with open(encrypted_path, "wb") as f:
+        f.write(tamper(data, offset))
+
+    assert core.decrypt_file(encrypted_path, key_path, **decrypt_options) == INTEGRITY_ERROR
+    assert sorted(os.listdir(tmp_path)) == ["dane.bin.enc", "dane.bin.key"]
+
+
+@pytest.mark.parametrize("tamper", [truncate, flip_bit, append_data])
+def test_legacy_tamper_is_detected(tmp_path, tamper):
+    encrypted_path, key_path = encrypt(tmp_path, os.urandom(4 * CHUNK + 1), format_version=core.FORMAT_LEGACY)
+    with open(encrypted_path, "rb") as f:
+        data = f.read()
+    with open(encrypted_path, "wb") as f:
+        f.write(tamper(data, 16))
+
+    assert core.decrypt_file(encrypted_path, key_path) == "Błąd weryfikacji HMAC."
+    assert not os.path.exists(tmp_path / "dane.bin")
+
+
+# Nagłówek jest uwierzytelniany jako AAD każdego segmentu
+def test_header_change_is_detected(tmp_path):
+    encrypted_path, key_path = encrypt(tmp_path, os.urandom(CHUNK))
+    with open(encrypted_path, "rb") as f:
+        nonce_prefix = core.read_container_header(f)["nonce_prefix"]
+        f.seek(0)
+        data = bytearray(f.read())
+    data[data.index(nonce_prefix)] ^= 1
+    with open(encrypted_path, "wb") as f:
+        f.write(data)
+
+    assert core.decrypt_file(encrypted_path, key_path) == INTEGRITY_ERROR
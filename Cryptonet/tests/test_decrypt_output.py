@@ -0,0 +1,38 @@
+import os
+
+import core
+
+
+def encrypt_with_master_key(tmp_path, name, data):
+    master_key = str(tmp_path / "master.key")
+    core.create_master_key(master_key)
+    source = tmp_path / name
+    source.write_bytes(data)
+    encrypted_path, _ = core.encrypt_file(str(source), key_path=master_key, raise_errors=True)
+    os.remove(source)
+    return encrypted_path, master_key
+
+
+# Usuwane jest tylko końcowe .enc (x.enc.txt.enc -> x.enc.txt)
+def test_strips_only_trailing_extension(tmp_path):
+    encrypted_path, master_key = encrypt_with_master_key(tmp_path, "x.enc.txt", b"dane")
+    assert core.decrypt_file(encrypted_path, master_key) == str(tmp_path / "x.enc.txt")
+    assert (tmp_path / "x.enc.txt").read_bytes() == b"dane"
+
+
+# Plik bez rozszerzenia .enc nie może zostać nadpisany wynikiem ani usunięty
+def test_file_without_extension_is_never_overwritten(tmp_path):
+    encrypted_path, master_key = encrypt_with_master_key(tmp_path, "bk", b"dane")
+    renamed_path = str(tmp_path / "bk.bin")
+    os.replace(encrypted_path, renamed_path)
+    encrypted = open(renamed_path, "rb").read()
+
+    for output_path in (None, renamed_path):
+        result = core.decrypt_file(renamed_path, master_key, delete_encrypted=True, output_path=output_path)
+        assert result != renamed_path
+        assert open(renamed_path, "rb").read() == encrypted
+
+    output_path = str(tmp_path / "out")
+    assert core.decrypt_file(renamed_path, master_key, delete_encrypted=True, output_path=output_path) == output_path
+    assert open(output_path, "rb").read() == b"dane"
+    assert not os.path.exists(renamed_path)
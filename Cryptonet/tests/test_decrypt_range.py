@@ -0,0 +1,63 @@
+import os
+
+import pytest
+from cryptography.exceptions import InvalidTag
+
+import core
+
+CHUNK = core.MIN_CHUNK_SIZE
+
+
+@pytest.fixture
+def encrypted(tmp_path):
+    data = os.urandom(4 * CHUNK + 100)
+    source = tmp_path / "dane.bin"
+    source.write_bytes(data)
+    encrypted_path, key_path = core.encrypt_file(str(source), chunk_size=CHUNK, raise_errors=True)
+    return encrypted_path, key_path, data
+
+
+# Zakresy wewnątrz segmentu, na granicach segmentów, obejmujące kilka segmentów i wychodzące poza koniec pliku
+@pytest.mark.parametrize("offset, length", [
+    (0, 10), (CHUNK - 5, 10), (CHUNK, CHUNK), (100, 3 * CHUNK), (4 * CHUNK + 90, 100), (5 * CHUNK, 10), (0, 0),
+])
+def test_decrypt_range_matches_plaintext(encrypted, offset, length):
+    encrypted_path, key_path, data = encrypted
+    assert core.decrypt_range(encrypted_path, key_path, offset, length) == data[offset:offset + length]
+
+
+def test_open_encrypted_seek_and_read(encrypted):
+    encrypted_path, key_path, data = encrypted
+    with core.open_encrypted(encrypted_path, key_path) as f:
+        assert f.size == len(data)
+        assert f.seek(-50, os.SEEK_END) == len(data) - 50
+        assert f.read() == data[-50:]
+        f.seek(CHUNK + 1)
+        buffer = bytearray(CHUNK)
+        assert f.readinto(buffer) == CHUNK
+        assert buffer == data[CHUNK + 1:2 * CHUNK + 1]
+
+
+# Zmieniony segment jest wykrywany przy odczycie obejmującego go zakresu, a pozostałe segmenty są czytelne
+def test_tampered_segment_fails_only_its_range(encrypted):
+    encrypted_path, key_path, data = encrypted
+    with open(encrypted_path, "r+b") as f:
+        header_size = len(core.read_container_header(f)["raw"])
+        f.seek(header_size + 2 * (CHUNK + core.TAG_SIZE) + 1)
+        byte = f.read(1)
+        f.seek(-1, os.SEEK_CUR)
+        f.write(bytes([byte[0] ^ 1]))
+
+    assert core.decrypt_range(encrypted_path, key_path, 0, CHUNK) == data[:CHUNK]
+    with pytest.raises(InvalidTag):
+        core.decrypt_range(encrypted_path, key_path, 2 * CHUNK, 10)
+
+
+def test_legacy_file_has_no_random_access(tmp_path):
+    source = tmp_path / "dane.bin"
+    source.write_bytes(b"dane")
+    encrypted_path, key_path = core.encrypt_file(
+        str(source), format_version=core.FORMAT_LEGACY, raise_errors=True
+    )
+    with pytest.raises(ValueError):
+        core.decrypt_range(encrypted_path, key_path, 0, 4)
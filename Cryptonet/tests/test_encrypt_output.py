@@ -0,0 +1,47 @@
+import os
+
+import pytest
+
+import core
+
+CHUNK = core.MIN_CHUNK_SIZE
+
+
+# Błąd w trakcie szyfrowania nie zostawia obciętego pliku .enc ani pliku tymczasowego
+# i nie zastępuje wcześniej zaszyfrowanego pliku
+@pytest.mark.parametrize("options", [{}, {"workers": 4}, {"io_mode": "mmap", "workers": 4}])
+def test_failed_encryption_keeps_previous_output(tmp_path, monkeypatch, options):
+    source = tmp_path / "dane.bin"
+    source.write_bytes(os.urandom(8 * CHUNK))
+    encrypted_path, key_path = core.encrypt_file(str(source), chunk_size=CHUNK, raise_errors=True)
+    previous = (open(encrypted_path, "rb").read(), open(key_path, "rb").read())
+
+    calls = []
+    encrypt_segment_into = core.encrypt_segment_into
+
+    def failing_encrypt_segment_into(*args):
+        calls.append(args[2])
+        if len(calls) > 3:
+            raise OSError("błąd zapisu")
+        return encrypt_segment_into(*args)
+
+    monkeypatch.setattr(core, "encrypt_segment_into", failing_encrypt_segment_into)
+    assert core.encrypt_file(str(source), chunk_size=CHUNK, **options) == (None, None)
+    monkeypatch.undo()
+
+    assert (open(encrypted_path, "rb").read(), open(key_path, "rb").read()) == previous
+    assert sorted(os.listdir(tmp_path)) == ["dane.bin", "dane.bin.enc", "dane.bin.key"]
+    assert core.decrypt_file(encrypted_path, key_path, output_path=str(tmp_path / "wynik")) == str(tmp_path / "wynik")
+
+
+def test_failed_legacy_encryption_leaves_no_files(tmp_path, monkeypatch):
+    source = tmp_path / "dane.bin"
+    source.write_bytes(os.urandom(4 * CHUNK))
+
+    def failing_encrypt_legacy_stream(src, dst, *args):
+        dst.write(b"x" * CHUNK)
+        raise OSError("błąd odczytu")
+
+    monkeypatch.setattr(core, "encrypt_legacy_stream", failing_encrypt_legacy_stream)
+    assert core.encrypt_file(str(source), format_version=core.FORMAT_LEGACY) == (None, None)
+    assert os.listdir(tmp_path) == ["dane.bin"]
@@ -0,0 +1,11 @@
+import pytest
+
+import bench
+
+
+# Import core/anonymize/cli w świeżym procesie nie może ładować GUI, NLP, OCR ani NumPy
+@pytest.mark.parametrize("module", ["core", "anonymize", "cli"])
+def test_import_does_not_load_heavy_modules(module):
+    result = bench.bench_import_time(module)
+    assert result["heavy_modules"] == []
+    assert result["import_ms"] > 0
@@ -0,0 +1,33 @@
+import pytest
+
+import core
+
+
+# Parametry z niezaufanego nagłówka nie mogą wymusić kosztu wielokrotnie większego niż kalibracja
+@pytest.mark.parametrize("params", [
+    {"kdf": "pbkdf2", "iterations": 50000000},
+    {"kdf": "scrypt", "log_n": core.KDF_CALIBRATION_MAX_SCRYPT_LOG_N + 1, "r": 8, "p": 1},
+    {"kdf": "scrypt", "log_n": 20, "r": 32, "p": 1},
+    {"kdf": "pbkdf2", "iterations": 10000000},
+    {"kdf": "argon2id", "iterations": 64, "memory_kib": core.KDF_ARGON2_MEMORY_KIB, "lanes": 4},
+    {"kdf": "argon2id", "iterations": 2, "memory_kib": 2 * core.KDF_ARGON2_MEMORY_KIB, "lanes": 4},
+])
+def test_rejects_excessive_kdf_params(params):
+    with pytest.raises(ValueError):
+        core.validate_kdf_params(params)
+
+
+# Wynik kalibracji zawsze mieści się w dopuszczalnych zakresach
+@pytest.mark.parametrize("kdf", ["pbkdf2", "scrypt"])
+def test_calibrated_params_are_within_limits(kdf):
+    params = core.calibrate_kdf(kdf, target_ms=50)
+    assert core.validate_kdf_params(params) == params
+
+
+# Nagłówek z wieloma slotami hasła jest odrzucany bez wyprowadzania kluczy
+def test_rejects_multiple_password_slots(monkeypatch):
+    slot = core.wrap_password_key("hasło", bytes(32), {"kdf": "pbkdf2", "iterations": 120000})
+    header = {"extensions": {core.EXT_PASSWORD_KEY: [slot] * 20}}
+    monkeypatch.setattr(core, "derive_password_key", lambda *args: pytest.fail("wyprowadzono klucz"))
+    with pytest.raises(ValueError):
+        core.unwrap_password_key("hasło", header)
@@ -0,0 +1,17 @@
+import logging
+
+import core
+
+
+# Dziennik operacji nie może zawierać kluczy: zastąpiłby plik .key albo hasło
+def test_keys_are_not_logged(tmp_path, caplog):
+    source = tmp_path / "dane.txt"
+    source.write_bytes(b"dane" * 100)
+    for format_version in (core.FORMAT_LEGACY, core.FORMAT_SEGMENTED):
+        with caplog.at_level(logging.INFO):
+            encrypted_path, key_path = core.encrypt_file(str(source), format_version=format_version, raise_errors=True)
+            assert core.decrypt_file(encrypted_path, key_path) == str(source)
+        _, key, hmac_key = core.read_key_file(key_path)
+        for secret in filter(None, (key, hmac_key)):
+            assert secret.hex() not in caplog.text
+        caplog.clear()
@@ -0,0 +1,110 @@
+import io
+import os
+import subprocess
+import sys
+
+import pytest
+from cryptography.exceptions import InvalidTag
+
+import core
+
+CHUNK = core.MIN_CHUNK_SIZE
+CRYPTONET_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# Potok bez seek/tell (jak stdin), czytany porcjami o zmiennej długości
+class Pipe(io.RawIOBase):
+    def __init__(self, data):
+        self._data = io.BytesIO(data)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        return self._data.readinto(memoryview(buffer)[:CHUNK // 3 + 1])
+
+
+def encrypt_stream(data, key_path, compress=False):
+    encrypted = io.BytesIO()
+    core.encrypt_stream(io.BufferedReader(Pipe(data)), encrypted, key_path, compress, CHUNK)
+    return encrypted.getvalue()
+
+
+def decrypt_stream(encrypted, key_path):
+    decrypted = io.BytesIO()
+    core.decrypt_stream(io.BufferedReader(Pipe(encrypted)), decrypted, key_path, CHUNK)
+    return decrypted.getvalue()
+
+
+@pytest.mark.parametrize("size", [0, 1, CHUNK, 3 * CHUNK, 3 * CHUNK + 7])
+@pytest.mark.parametrize("use_master_key", [False, True])
+def test_stream_round_trip(tmp_path, size, use_master_key):
+    key_path = str(tmp_path / "strumien.key")
+    if use_master_key:
+        core.create_master_key(key_path)
+    data = os.urandom(size)
+    encrypted = encrypt_stream(data, key_path)
+    assert decrypt_stream(encrypted, key_path) == data
+
+
+def test_compressed_stream_round_trip(tmp_path):
+    key_path = str(tmp_path / "strumien.key")
+    data = b"2024-01-01 INFO wiersz dziennika\n" * 2000
+    encrypted = encrypt_stream(data, key_path, compress=True)
+    assert len(encrypted) < len(data) // 4
+    assert decrypt_stream(encrypted, key_path) == data
+
+
+# Strumień zaszyfrowany to zwykły kontener segmentowy: odszyfrowuje go także decrypt_file
+def test_stream_output_is_a_container_file(tmp_path):
+    key_path = str(tmp_path / "strumien.key")
+    data = os.urandom(2 * CHUNK + 3)
+    (tmp_path / "dane.bin.enc").write_bytes(encrypt_stream(data, key_path))
+    assert core.decrypt_file(str(tmp_path / "dane.bin.enc"), key_path, workers=4) == str(tmp_path / "dane.bin")
+    assert (tmp_path / "dane.bin").read_bytes() == data
+
+
+def test_truncated_stream_is_rejected(tmp_path):
+    key_path = str(tmp_path / "strumien.key")
+    encrypted = encrypt_stream(os.urandom(2 * CHUNK), key_path)
+    with pytest.raises(InvalidTag):
+        decrypt_stream(encrypted[:-(CHUNK + core.TAG_SIZE)], key_path)
+
+
+def test_existing_key_file_is_not_overwritten(tmp_path):
+    key_path = tmp_path / "istniejacy.key"
+    key_path.write_bytes(b"inny klucz")
+    with pytest.raises(ValueError):
+        encrypt_stream(b"dane", str(key_path))
+    assert key_path.read_bytes() == b"inny klucz"
+
+
+# Wiersz poleceń: stdin -> stdout w obie strony
+def test_cli_stream_round_trip(tmp_path):
+    data = os.urandom(3 * CHUNK + 11)
+    key_path = str(tmp_path / "strumien.key")
+    log_path = str(tmp_path / "operations.log")
+
+    def run(*args, stdin):
+        return subprocess.run(
+            [sys.executable, "cli.py", "--log", log_path, *args], input=stdin, cwd=CRYPTONET_DIR,
+            capture_output=True, check=True,
+        ).stdout
+
+    encrypted = run("encrypt", "-", "--key", key_path, "--chunk-size", str(CHUNK), stdin=data)
+    assert run("decrypt", "-", "--key", key_path, stdin=encrypted) == data
+
+
+# Opcje plików nie są po cichu pomijane dla strumienia (np. --password nie dodałby slotu hasła)
+@pytest.mark.parametrize("option", [["--password"], ["--recipient", "odbiorca.pem"], ["--legacy"],
+                                    ["--io-mode", "mmap"], ["--delete-original"]])
+def test_cli_rejects_file_options_for_stream(tmp_path, option):
+    key_path = str(tmp_path / "strumien.key")
+    result = subprocess.run(
+        [sys.executable, "cli.py", "--log", str(tmp_path / "operations.log"), "encrypt", "-", "--key", key_path,
+         *option],
+        input=b"dane", cwd=CRYPTONET_DIR, capture_output=True,
+    )
+    assert result.returncode == 2
+    assert result.stdout == b""
+    assert not os.path.exists(key_path)